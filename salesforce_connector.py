@@ -17,67 +17,357 @@
 # Splunk SOAR App imports
 
 import base64
+import copy
+import csv
+import fcntl
 import hashlib
+import io
 import json
-
-# import re
 import os
+import random
+import re
 import secrets
+import select
+import sqlite3
+import stat
 import sys
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import formatdate
 from urllib.parse import urlparse
 
 import encryption_helper
 import phantom.app as phantom
+import phantom.rules as ph_rules
 import requests
 from bs4 import BeautifulSoup
 from django.http import HttpResponse
 from phantom.action_result import ActionResult
 from phantom.base_connector import BaseConnector
+from phantom.vault import Vault
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Usage of the consts file is recommended
 import salesforce_consts as sf_consts
 
 
+try:
+    # orjson is optional, it parses large list view and query pages several times faster
+    import orjson
+except ImportError:
+    orjson = None
+
+
 DT_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
 
+# Marks a key missing from a state dictionary, None is a valid state value
+_MISSING = object()
+
+
+def _json_loads(content):
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
 
 class RetVal(tuple):
     def __new__(cls, val1, val2=None):
         return tuple.__new__(RetVal, (val1, val2))
 
 
-def _delete_app_state(asset_id, app_connector=None):
-    dirpath = os.path.split(__file__)[0]
-    state_file = f"{dirpath}/{asset_id}_state.json"
+class TokenBucket:
+    """Thread-safe token bucket limiting the rate of the requests sent to Salesforce, or of the bytes downloaded.
+
+    A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate, capacity):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._rate = rate
+
+    def acquire(self, tokens=1):
+        """Take tokens, waiting until they are available. The capacity must be at least the number of tokens.
+
+        :return: number of seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                if not self._rate:
+                    return waited
+
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+                self._updated_at = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+
+                wait = (tokens - self._tokens) / self._rate
+
+            time.sleep(wait)
+            waited += wait
+
+
+class SharedTokenBucket(TokenBucket):
+    """Token bucket shared by the action runs of an asset, its tokens are kept in a file updated under a lock.
+
+    The tokens of the file are refilled at the rate the bucket is created with. set_rate only slows down the
+    current action run, it is still limited by the tokens shared with the other action runs.
+    """
+
+    def __init__(self, path, rate, capacity):
+        super().__init__(rate, capacity)
+        self._path = path
+        self._shared_rate = rate
+
+    def _take_shared(self, tokens):
+        """Take tokens from the file, get the number of seconds to wait for them when there are not enough."""
+        with _locked(f"{self._path}.lock"):
+            try:
+                with open(self._path) as bucket_file:
+                    bucket = json.load(bucket_file)
+            except (OSError, ValueError):
+                bucket = {}
+
+            # The bucket is shared across processes, so it is refilled from the wall clock
+            now = time.time()
+            available = bucket.get("tokens", self._capacity) + max(0.0, now - bucket.get("updated_at", now)) * self._shared_rate
+            available = min(self._capacity, available)
+            wait = 0.0
+            if available >= tokens:
+                available -= tokens
+            else:
+                wait = (tokens - available) / self._shared_rate
+
+            with open(self._path, "w") as bucket_file:
+                json.dump({"tokens": available, "updated_at": now}, bucket_file)
+
+        return wait
+
+    def acquire(self, tokens=1):
+        waited = super().acquire(tokens)
+        while self._shared_rate:
+            wait = self._take_shared(tokens)
+            if not wait:
+                break
+
+            time.sleep(wait)
+            waited += wait
+
+        return waited
+
+
+class HashingWriter:
+    """Binary file wrapper computing the checksums of the data written to it, at a rate limited by a TokenBucket."""
+
+    def __init__(self, file_obj, byte_limiter=None):
+        self._file = file_obj
+        self._byte_limiter = byte_limiter
+        self.md5 = hashlib.md5(usedforsecurity=False)
+        self.sha1 = hashlib.sha1(usedforsecurity=False)
+        self.size = 0
+
+    def write(self, data):
+        if self._byte_limiter:
+            self._byte_limiter.acquire(len(data))
+        self.md5.update(data)
+        self.sha1.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+
+class SeenIndex:
+    """On-disk index of the ingested objects.
+
+    Maps the source data identifier of a container to the SystemModstamp of the object it was last ingested from
+    and to the ID of the container.
+    """
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen (sdi TEXT PRIMARY KEY, modstamp TEXT, container_id INTEGER)")
+
+    def get(self, sdi):
+        """:return: tuple of the SystemModstamp and the container ID, None for an object that was never ingested"""
+        return self._conn.execute("SELECT modstamp, container_id FROM seen WHERE sdi = ?", (sdi,)).fetchone()
+
+    def update(self, sdi, modstamp, container_id):
+        self._conn.execute("INSERT OR REPLACE INTO seen (sdi, modstamp, container_id) VALUES (?, ?, ?)", (sdi, modstamp, container_id))
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
+
+
+class ContainerTransformer:
+    """Convert the records of an sObject to containers.
+
+    Everything that only depends on the sObject and the asset configuration is computed once per poll,
+    the CEF name and type of every field are computed the first time the field is seen.
+    """
+
+    def __init__(self, sobject, cef_name_map, keep_last_viewed_date):
+        self._sobject = sobject
+        self._cef_name_map = cef_name_map
+        self._skip_field_names = {"attributes"}
+        if not keep_last_viewed_date:
+            self._skip_field_names.update(("LastViewedDate", "LastReferencedDate"))
+        self._field_plans = {}
+
+    def _get_field_plan(self, field_name):
+        plan = self._field_plans.get(field_name)
+        if plan is None:
+            plan = (self._cef_name_map.get(field_name, field_name), field_name.endswith("Id"))
+            self._field_plans[field_name] = plan
+        return plan
+
+    def transform(self, record):
+        cef = {}
+        cef_types = {}
+        container_name = None
+
+        for k, v in record.items():
+            if k in self._skip_field_names:
+                continue
+            name, is_id = self._field_plans.get(k) or self._get_field_plan(k)
+            cef[name] = v
+            if is_id and v is not None:
+                cef_types[name] = ["salesforce object id"]
+
+            if name == "Subject":
+                container_name = v
+
+        if container_name is None:
+            number = record.get("CaseNumber") or record.get("Id", "")
+            container_name = f"Salesforce {self._sobject} Object # {number}"
+
+        artifact = {"cef": cef, "cef_types": cef_types, "name": self._sobject}
+        # The artifact is serialized once, in the same key order as before, to keep the identifiers of ingested artifacts stable
+        artifact["source_data_identifier"] = hashlib.sha256(json.dumps(artifact).encode()).hexdigest()
+
+        container = {
+            "artifacts": [artifact],
+            "name": container_name,
+            "source_data_identifier": hashlib.sha256(f"{self._sobject}{record['Id']}".encode()).hexdigest(),
+        }
+
+        severity = record.get("Incident_Severity__c")
+        if severity:
+            container["severity"] = sf_consts.SALESFORCE_SEVERITY_MAPPING.get(severity.lower(), "medium")
+
+        sensitivity = record.get("Incident_Sensitivity__c")
+        if sensitivity:
+            container["sensitivity"] = sf_consts.SALESFORCE_SENSITIVITY_MAPPING.get(sensitivity.lower(), "amber")
+
+        return container
+
+
+@contextmanager
+def _locked(lock_path):
+    """Hold an exclusive lock on the lock file, shared by the actions and the REST handler of the app."""
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _get_umask():
+    """Get the umask of the process from /proc, setting it to read it with os.umask is not thread-safe."""
     try:
-        os.remove(state_file)
-    except:
+        with open("/proc/self/status") as status_file:
+            for line in status_file:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
         pass
+    return 0o022
 
-    return phantom.APP_SUCCESS
 
+def _write_json_atomically(path, data):
+    """Write the JSON data to a temporary file renamed over the file, readers never see a partially written file."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{os.path.basename(path)}.")
+    try:
+        # mkstemp creates the file readable by its owner only, the other processes of the app must still be able to read it
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_get_umask()
+        os.fchmod(fd, mode)
+
+        with os.fdopen(fd, "w") as temp_file:
+            temp_file.write(json.dumps(data))
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
 
-def _load_app_state(asset_id, app_connector=None):
-    """This function is used to load the current state file.
 
-    :param asset_id: asset_id
-    :param app_connector: Object of app_connector class
-    :return: state: Current state file as a dictionary
-    """
+def _get_app_state_file(asset_id, app_connector=None, caller="_get_app_state_file"):
+    """This function is used to get the path of the state file of the asset, None when the asset_id is invalid."""
 
     asset_id = str(asset_id)
     if not asset_id or not asset_id.isalnum():
         if app_connector:
-            app_connector.debug_print("In _load_app_state: Invalid asset_id")
-        return {}
+            app_connector.debug_print(f"In {caller}: Invalid asset_id")
+        return None
 
     app_dir = os.path.dirname(os.path.abspath(__file__))
     state_file = f"{app_dir}/{asset_id}_state.json"
     real_state_file_path = os.path.realpath(state_file)
     if not os.path.dirname(real_state_file_path) == app_dir:
         if app_connector:
-            app_connector.debug_print("In _load_app_state: Invalid asset_id")
+            app_connector.debug_print(f"In {caller}: Invalid asset_id")
+        return None
+
+    return real_state_file_path
+
+
+def _delete_app_state(asset_id, app_connector=None):
+    state_file = _get_app_state_file(asset_id, app_connector, "_delete_app_state")
+    if not state_file:
+        return phantom.APP_SUCCESS
+
+    try:
+        with _locked(f"{state_file}.lock"):
+            os.remove(state_file)
+    except:
+        pass
+
+    return phantom.APP_SUCCESS
+
+
+def _load_app_state(asset_id, app_connector=None):
+    """This function is used to load the current state file.
+
+    The state file is always replaced atomically, so it is read without taking the lock.
+
+    :param asset_id: asset_id
+    :param app_connector: Object of app_connector class
+    :return: state: Current state file as a dictionary
+    """
+
+    real_state_file_path = _get_app_state_file(asset_id, app_connector, "_load_app_state")
+    if not real_state_file_path:
         return {}
 
     state = {}
@@ -104,36 +394,83 @@ def _save_app_state(state, asset_id, app_connector=None):
     :return: status: phantom.APP_SUCCESS
     """
 
-    asset_id = str(asset_id)
-    if not asset_id or not asset_id.isalnum():
-        if app_connector:
-            app_connector.debug_print("In _save_app_state: Invalid asset_id")
-        return {}
-
-    app_dir = os.path.split(__file__)[0]
-    state_file = f"{app_dir}/{asset_id}_state.json"
-
-    real_state_file_path = os.path.realpath(state_file)
-    if not os.path.dirname(real_state_file_path) == app_dir:
-        if app_connector:
-            app_connector.debug_print("In _save_app_state: Invalid asset_id")
+    real_state_file_path = _get_app_state_file(asset_id, app_connector, "_save_app_state")
+    if not real_state_file_path:
         return {}
 
     if app_connector:
         app_connector.debug_print("Saving state: ", state)
 
     try:
-        with open(real_state_file_path, "w+") as state_file_obj:
-            state_file_obj.write(json.dumps(state))
+        with _locked(f"{real_state_file_path}.lock"):
+            _write_json_atomically(real_state_file_path, state)
     except Exception as e:
         print(f"Unable to save state file: {e!s}")
 
     return phantom.APP_SUCCESS
 
 
+def _update_app_state(updates, asset_id, app_connector=None):
+    """This function is used to set keys of the state file without overwriting the keys saved by another process.
+
+    :param updates: Dictionary which contains the keys to set in the state file
+    :param asset_id: asset_id
+    :param app_connector: Object of app_connector class
+    :return: status: phantom.APP_SUCCESS
+    """
+
+    real_state_file_path = _get_app_state_file(asset_id, app_connector, "_update_app_state")
+    if not real_state_file_path:
+        return {}
+
+    try:
+        with _locked(f"{real_state_file_path}.lock"):
+            state = {}
+            if os.path.exists(real_state_file_path):
+                with open(real_state_file_path) as state_file_obj:
+                    state = json.loads(state_file_obj.read())
+            state.update(updates)
+            _write_json_atomically(real_state_file_path, state)
+    except Exception as e:
+        print(f"Unable to update state file: {e!s}")
+
+    return phantom.APP_SUCCESS
+
+
+def _get_oauth_fifo_path(asset_id):
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    return f"{app_dir}/{asset_id}_oauth.fifo"
+
+
+def _notify_oauth_complete(asset_id):
+    """This function is used to wake up the test connectivity action waiting for the OAuth callback.
+
+    :param asset_id: asset_id
+    """
+
+    asset_id = str(asset_id)
+    if not asset_id or not asset_id.isalnum():
+        return
+
+    try:
+        fd = os.open(_get_oauth_fifo_path(asset_id), os.O_WRONLY | os.O_NONBLOCK)
+    except OSError:
+        # No action is waiting on the FIFO, a waiting action still finds the state file on its next check
+        return
+
+    try:
+        if stat.S_ISFIFO(os.fstat(fd).st_mode):
+            os.write(fd, b"1")
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
 def _return_error(msg, state, asset_id, status):
     state["error"] = True
-    _save_app_state(state, asset_id)
+    _update_app_state({"error": True}, asset_id)
+    _notify_oauth_complete(asset_id)
     return HttpResponse(msg, status=status, content_type="text/plain")
 
 
@@ -179,8 +516,8 @@ def _handle_oauth_start(request, path_parts):
         refresh_token = resp_json.get("refresh_token")
         if not refresh_token:
             return _return_error("Unable to retrieve refresh token. Maybe app scope is set incorrectly?", state, asset_id, 401)
-        state["refresh_token"] = encryption_helper.encrypt(refresh_token, asset_id)  # pylint: disable=E1101
-        _save_app_state(state, asset_id)
+        _update_app_state({"refresh_token": encryption_helper.encrypt(refresh_token, asset_id)}, asset_id)  # pylint: disable=E1101
+        _notify_oauth_complete(asset_id)
         return HttpResponse("You can now close this page", content_type="text/plain")
 
     # Salesforce sends `error` and `error_description` when the user denies or an error occurs.
@@ -242,11 +579,20 @@ class SalesforceConnector(BaseConnector):
         super().__init__()
 
         self._state = None
+        self._loaded_state = {}
         self._base_url = None
         self._oauth_token = None
         self._version_uri = None
         self._auth_flow = self.OAUTH_FLOW
         self._last_viewed_date = None
+        self._container_transformers = {}
+        self._related_objects = {}
+        self._related_objects_lock = threading.Lock()
+        self._session = None
+        self._token_lock = threading.Lock()
+        self._rate_limiter = None
+        self._usage_lock = threading.Lock()
+        self._api_counters = {"api_calls": 0, "retries": 0, "throttled_seconds": 0.0}
 
     def _get_error_message_from_exception(self, e):
         """
@@ -350,6 +696,55 @@ class SalesforceConnector(BaseConnector):
 
         return phantom.APP_SUCCESS, parameter
 
+    def _create_session(self, pool_size):
+        """Create the HTTP session shared by every REST call made during this action run.
+
+        Connections to the same host are kept alive and reused from the pool, so the TCP and TLS
+        handshakes are paid once per host instead of once per request. Only connection errors are
+        retried by the adapter, a request that already reached the server is never re-sent.
+
+        Parameters:
+            :param pool_size: maximum number of connections kept per host
+        Returns:
+            :return: requests.Session object
+        """
+
+        retry = Retry(
+            total=sf_consts.SALESFORCE_CONNECT_RETRIES,
+            connect=sf_consts.SALESFORCE_CONNECT_RETRIES,
+            read=0,
+            status=0,
+            backoff_factor=sf_consts.SALESFORCE_RETRY_BACKOFF_FACTOR,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Connection": "keep-alive"})
+        return session
+
+    def _parse_field_names(self, action_result, fields, key):
+        """Parse a comma-separated list of Salesforce field names.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param fields: comma-separated field names
+            :param key: string value of parameter name
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), list of field names
+        """
+        if not fields:
+            return phantom.APP_SUCCESS, []
+
+        field_names = [x.strip() for x in fields.split(",") if x.strip()]
+        for field_name in field_names:
+            if not re.fullmatch(sf_consts.SALESFORCE_FIELD_NAME_REGEX, field_name):
+                return action_result.set_status(phantom.APP_ERROR, f"Invalid field name '{field_name}' in the '{key}' parameter"), None
+
+        # Keep the first occurrence of every field, Salesforce rejects duplicate fields in a query
+        return phantom.APP_SUCCESS, list(dict.fromkeys(field_names))
+
     def _process_empty_response(self, response, action_result):
         """Process empty response.
 
@@ -363,7 +758,8 @@ class SalesforceConnector(BaseConnector):
         if self.get_action_identifier() in ("update_ticket", "update_object", "delete_object", "delete_ticket"):
             return RetVal(phantom.APP_SUCCESS, {})
 
-        if response.status_code == 200:
+        # 201 Created and 204 No Content are returned without a body, for example by the bulk ingest uploads
+        if 200 <= response.status_code < 300:
             return RetVal(phantom.APP_SUCCESS, {})
 
         return RetVal(action_result.set_status(phantom.APP_ERROR, "Empty response and no information in the header"), None)
@@ -407,9 +803,9 @@ class SalesforceConnector(BaseConnector):
             :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), response
         """
 
-        # Try a json parse
+        # Try a json parse, directly from the raw bytes so that the body is only decoded once
         try:
-            resp_json = r.json()
+            resp_json = _json_loads(r.content)
         except Exception as e:
             error_message = self._get_error_message_from_exception(e)
             return RetVal(action_result.set_status(phantom.APP_ERROR, f"Unable to parse JSON response. Error: {error_message}"), None)
@@ -434,12 +830,31 @@ class SalesforceConnector(BaseConnector):
             :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), response
         """
 
-        # store the r_text in debug data, it will get dumped in the logs if the action fails
-        if hasattr(action_result, "add_debug_data"):
+        ret_val, response = self._process_response_content(r, action_result)
+
+        # store the r_text in debug data, it will get dumped in the logs as the action fails.
+        # Successful responses are not copied, a single list view page can be several megabytes.
+        if phantom.is_fail(ret_val) and hasattr(action_result, "add_debug_data"):
             action_result.add_debug_data({"r_status_code": r.status_code})
-            action_result.add_debug_data({"r_text": r.text})
+            action_result.add_debug_data({"r_text": r.text[: sf_consts.SALESFORCE_DEBUG_TEXT_MAX_LENGTH]})
             action_result.add_debug_data({"r_headers": r.headers})
 
+        return RetVal(ret_val, response)
+
+    def _process_response_content(self, r, action_result):
+        """Process API response based on its content type.
+
+        Parameters:
+            :param r: response data
+            :param action_result: object of ActionResult class
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), response
+        """
+
+        # Conditional requests with If-Modified-Since return 304 without a body when the cached copy is still up to date
+        if r.status_code == 304:
+            return RetVal(phantom.APP_SUCCESS, None)
+
         # Process each 'Content-Type' of response separately
 
         # Process a json response
@@ -457,7 +872,7 @@ class SalesforceConnector(BaseConnector):
             return self._process_html_response(r, action_result)
 
         # it's not content-type that is to be parsed, handle an empty response
-        if not r.text:
+        if not r.content:
             return self._process_empty_response(r, action_result)
 
         # everything else is actually an error at this point
@@ -467,8 +882,40 @@ class SalesforceConnector(BaseConnector):
 
         return RetVal(action_result.set_status(phantom.APP_ERROR, message), None)
 
+    def _process_stream_response(self, r, action_result, output_file):
+        """Write the body of a successful response to a file chunk by chunk, without loading it in memory.
+
+        Parameters:
+            :param r: response data
+            :param action_result: object of ActionResult class
+            :param output_file: binary file object the body is written to
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), response headers
+        """
+        try:
+            for chunk in r.iter_content(chunk_size=sf_consts.SALESFORCE_STREAM_CHUNK_SIZE):
+                output_file.write(chunk)
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            return RetVal(action_result.set_status(phantom.APP_ERROR, f"Error reading response from server. Details: {error_message}"), None)
+        finally:
+            r.close()
+
+        return RetVal(phantom.APP_SUCCESS, r.headers)
+
     def _make_rest_call(
-        self, endpoint, action_result, headers=None, params=None, data=None, json=None, method="get", ignore_base_url=False, **kwargs
+        self,
+        endpoint,
+        action_result,
+        headers=None,
+        params=None,
+        data=None,
+        json=None,
+        method="get",
+        ignore_base_url=False,
+        output_file=None,
+        session=None,
+        **kwargs,
     ):
         """Make the REST call to the app.
 
@@ -481,6 +928,8 @@ class SalesforceConnector(BaseConnector):
             :param json: JSON object
             :param method: GET/POST/PUT/DELETE/PATCH (Default will be GET)
             :param ignore_base_url: Ignore the base url and use endpoint as url (Default False)
+            :param output_file: binary file object a successful response body is streamed to, the response headers are returned instead
+            :param session: requests.Session object to use instead of the session of the action run
             :param **kwargs: Dictionary of other parameters
         Returns:
             :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), response obtained by making an API call
@@ -488,7 +937,7 @@ class SalesforceConnector(BaseConnector):
         resp_json = None
 
         try:
-            request_func = getattr(requests, method)
+            request_func = getattr(session or self._session, method)
         except AttributeError:
             return RetVal(action_result.set_status(phantom.APP_ERROR, f"Invalid method: {method}"), resp_json)
 
@@ -500,14 +949,89 @@ class SalesforceConnector(BaseConnector):
                 return RetVal(action_result.set_status(phantom.APP_ERROR, "Base URL is None"), resp_json)
             url = f"{self._base_url}{endpoint}"
 
-        try:
-            r = request_func(url, json=json, data=data, headers=headers, params=params, **kwargs)
-        except Exception as e:
-            error_message = self._get_error_message_from_exception(e)
-            return RetVal(action_result.set_status(phantom.APP_ERROR, f"Error Connecting to server. Details: {error_message}"), resp_json)
+        # The token endpoints and the SOAR platform are not part of the API request limits of the organization
+        is_api_call = not ignore_base_url
+
+        for attempt in range(sf_consts.SALESFORCE_MAX_RETRIES + 1):
+            if is_api_call and self._rate_limiter:
+                throttled = self._rate_limiter.acquire()
+                self._update_api_counters(api_calls=1, throttled_seconds=throttled)
+
+            try:
+                r = request_func(url, json=json, data=data, headers=headers, params=params, stream=output_file is not None, **kwargs)
+            except Exception as e:
+                error_message = self._get_error_message_from_exception(e)
+                return RetVal(action_result.set_status(phantom.APP_ERROR, f"Error Connecting to server. Details: {error_message}"), resp_json)
+
+            if is_api_call:
+                self._update_api_usage(r)
+
+            if attempt == sf_consts.SALESFORCE_MAX_RETRIES or not self._is_retryable_response(r):
+                break
+
+            wait = self._get_retry_wait(r, attempt)
+            self.debug_print(f"Got status code {r.status_code} from server, retrying in {wait:.1f} seconds")
+            self._update_api_counters(retries=1)
+            r.close()
+            time.sleep(wait)
+
+        if output_file is not None and 200 <= r.status_code < 399:
+            return self._process_stream_response(r, action_result, output_file)
 
         return self._process_response(r, action_result)
 
+    def _update_api_counters(self, **increments):
+        with self._usage_lock:
+            for key, value in increments.items():
+                self._api_counters[key] += value
+
+    def _update_api_usage(self, r):
+        """Record the daily API usage of the organization reported by the Sforce-Limit-Info header."""
+
+        limit_info = r.headers.get("Sforce-Limit-Info")
+        match = re.search(r"(?<![-\w])api-usage=(\d+)/(\d+)", limit_info or "")
+        if not match:
+            return
+
+        with self._usage_lock:
+            self._state["api_usage"] = {"used": int(match.group(1)), "max": int(match.group(2)), "updated_at": int(time.time())}
+
+    def _get_api_budget(self):
+        """Get the fraction of the daily API requests left, None when it is unknown or too old to be trusted."""
+
+        api_usage = self._state.get("api_usage")
+        if not api_usage or not api_usage.get("max"):
+            return None
+
+        if time.time() - api_usage["updated_at"] > sf_consts.SALESFORCE_API_USAGE_MAX_AGE:
+            return None
+
+        return max(0, api_usage["max"] - api_usage["used"]) / api_usage["max"]
+
+    def _is_retryable_response(self, r):
+        if r.status_code in (429, 503):
+            return True
+
+        # Concurrent request limits clear up quickly, the daily limit (TotalRequests) does not
+        if r.status_code == 403 and "REQUEST_LIMIT_EXCEEDED" in r.text:
+            if "TotalRequests" in r.text:
+                with self._usage_lock:
+                    self._state["api_usage"] = {"used": 1, "max": 1, "updated_at": int(time.time())}
+                return False
+            return True
+
+        return False
+
+    def _get_retry_wait(self, r, attempt):
+        """Get the number of seconds to wait before a retry, honoring Retry-After, with a jittered exponential backoff."""
+
+        retry_after = r.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(int(retry_after), sf_consts.SALESFORCE_RETRY_MAX_WAIT)
+
+        wait = min(sf_consts.SALESFORCE_RETRY_MAX_WAIT, sf_consts.SALESFORCE_RETRY_BACKOFF_FACTOR * 2 ** (attempt + 1))
+        return random.uniform(wait / 2, wait)  # nosemgrep: jitter, not used for security
+
     def _retrieve_oauth_token(self, action_result):
         """This function is used to get a Oauth token via REST Call.
 
@@ -554,7 +1078,7 @@ class SalesforceConnector(BaseConnector):
         new_refresh_token = resp.get("refresh_token")
         if new_refresh_token:
             self._state["refresh_token"] = encryption_helper.encrypt(new_refresh_token, self.get_asset_id())  # pylint: disable=E1101
-            self.save_state(self._state)
+            self._save_state(["refresh_token"])
 
         return phantom.APP_SUCCESS
 
@@ -635,10 +1159,52 @@ class SalesforceConnector(BaseConnector):
             :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message)
         """
         if self._auth_flow == self.OAUTH_FLOW:
-            return self._retrieve_oauth_token(action_result)
-        if self._auth_flow == self.CLIENT_CREDENTIALS:
-            return self._retrieve_oauth_token_client_credentials(action_result)
-        return self._retrieve_oauth_token_username_password(action_result)
+            ret_val = self._retrieve_oauth_token(action_result)
+        elif self._auth_flow == self.CLIENT_CREDENTIALS:
+            ret_val = self._retrieve_oauth_token_client_credentials(action_result)
+        else:
+            ret_val = self._retrieve_oauth_token_username_password(action_result)
+
+        if phantom.is_fail(ret_val):
+            self._clear_cached_oauth_token()
+            return ret_val
+
+        self._save_oauth_token_to_state()
+        return phantom.APP_SUCCESS
+
+    def _load_oauth_token_from_state(self):
+        """Reuse the access token issued to a previous action run if it has not expired yet."""
+
+        enc_token = self._state.get("oauth_token")
+        instance_url = self._state.get("instance_url")
+        issued_at = self._state.get("token_issued_at")
+        if not (enc_token and instance_url and issued_at):
+            return
+
+        if time.time() - issued_at >= sf_consts.SALESFORCE_TOKEN_MAX_AGE:
+            self.debug_print("Cached access token has expired")
+            return
+
+        try:
+            self._oauth_token = encryption_helper.decrypt(enc_token, self.get_asset_id())  # pylint: disable=E1101
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            self.debug_print(f"Unable to decrypt the cached access token. {error_message}")
+            return
+
+        self._base_url = instance_url
+
+    def _save_oauth_token_to_state(self):
+        """Store the current access token so that the following action runs can skip the token endpoint."""
+
+        self._state["oauth_token"] = encryption_helper.encrypt(self._oauth_token, self.get_asset_id())  # pylint: disable=E1101
+        self._state["instance_url"] = self._base_url
+        self._state["token_issued_at"] = int(time.time())
+
+    def _clear_cached_oauth_token(self):
+        self._oauth_token = None
+        for key in ("oauth_token", "instance_url", "token_issued_at"):
+            self._state.pop(key, None)
 
     def _make_rest_call_helper(self, endpoint, action_result, headers=None, *args, **kwargs):
         """Function that helps setting REST call to the app.
@@ -656,15 +1222,32 @@ class SalesforceConnector(BaseConnector):
         if headers is None:
             headers = {}
 
-        if not self._oauth_token:
-            self.save_progress("Retrieving API URL and OAuth Token...")
-            ret_val = self._retrieve_oauth_token_helper(action_result)
-            if phantom.is_fail(ret_val):
-                return RetVal(ret_val)
+        # REST calls may be issued from several worker threads, only one of them should hit the token endpoint
+        with self._token_lock:
+            if not self._oauth_token:
+                self.save_progress("Retrieving API URL and OAuth Token...")
+                ret_val = self._retrieve_oauth_token_helper(action_result)
+                if phantom.is_fail(ret_val):
+                    return RetVal(ret_val)
+            used_token = self._oauth_token
+
+        headers.update({"Authorization": f"Bearer {used_token}"})
 
-        headers.update({"Authorization": f"Bearer {self._oauth_token}"})
+        ret_val, response = self._make_rest_call(endpoint, action_result, headers=headers, *args, **kwargs)
+        if phantom.is_fail(ret_val) and sf_consts.SALESFORCE_INVALID_SESSION_ERR in action_result.get_message():
+            # The cached token was revoked or timed out on the server side, get a new one and retry once
+            with self._token_lock:
+                if self._oauth_token == used_token:
+                    self.save_progress("Access token is no longer valid. Retrieving a new OAuth Token...")
+                    self._clear_cached_oauth_token()
+                    ret_val = self._retrieve_oauth_token_helper(action_result)
+                    if phantom.is_fail(ret_val):
+                        return RetVal(ret_val)
 
-        return self._make_rest_call(endpoint, action_result, headers=headers, *args, **kwargs)
+            headers.update({"Authorization": f"Bearer {self._oauth_token}"})
+            return self._make_rest_call(endpoint, action_result, headers=headers, *args, **kwargs)
+
+        return RetVal(ret_val, response)
 
     def _get_asset_name(self, action_result):
         """Get name of the asset using Phantom URL.
@@ -756,6 +1339,75 @@ class SalesforceConnector(BaseConnector):
 
         return (phantom.APP_SUCCESS, url_to_app_rest)
 
+    def _wait_for_oauth_callback(self, asset_id):
+        """Wait until the OAuth callback handler saved the refresh token or an error in the app state.
+
+        The handler writes to a FIFO created here right after saving the state, which wakes up the wait immediately.
+        The state file is also checked on an increasing interval in case the FIFO is not available, and it is only
+        parsed again when it was notified or modified.
+
+        Parameters:
+            :param asset_id: asset_id
+        Returns:
+            :return: app state saved by the handler, None on time out
+        """
+        fifo_path = _get_oauth_fifo_path(asset_id)
+        read_fd = write_fd = None
+        try:
+            if os.path.lexists(fifo_path):
+                os.remove(fifo_path)
+            os.mkfifo(fifo_path, 0o600)
+            read_fd = os.open(fifo_path, os.O_RDONLY | os.O_NONBLOCK)
+            # Holding a write end keeps the FIFO from reporting end of file while the handler has not written yet
+            write_fd = os.open(fifo_path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            self.debug_print(f"Unable to create the OAuth notification FIFO, polling the state file instead. {e!s}")
+            for fd in (read_fd, write_fd):
+                if fd is not None:
+                    os.close(fd)
+            read_fd = write_fd = None
+
+        state_file = f"{os.path.dirname(os.path.abspath(__file__))}/{asset_id}_state.json"
+        last_mtime = None
+        interval = sf_consts.SALESFORCE_OAUTH_MIN_CHECK_INTERVAL
+        deadline = time.monotonic() + sf_consts.SALESFORCE_OAUTH_WAIT_TIMEOUT
+        try:
+            while True:
+                try:
+                    mtime = os.stat(state_file).st_mtime_ns
+                except OSError:
+                    mtime = None
+
+                if mtime is None or mtime != last_mtime:
+                    last_mtime = mtime
+                    state = _load_app_state(asset_id)
+                    if state.get("refresh_token") or state.get("error", False):
+                        return state
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+
+                if read_fd is None:
+                    time.sleep(min(interval, remaining))
+                else:
+                    readable, _, _ = select.select([read_fd], [], [], min(interval, remaining))
+                    if readable:
+                        os.read(read_fd, 512)
+                        # The state may have been saved twice within the resolution of the modification time
+                        last_mtime = None
+                        continue
+
+                interval = min(interval * 2, sf_consts.SALESFORCE_OAUTH_MAX_CHECK_INTERVAL)
+        finally:
+            for fd in (read_fd, write_fd):
+                if fd is not None:
+                    os.close(fd)
+            try:
+                os.remove(fifo_path)
+            except OSError:
+                pass
+
     def _oauth_flow_test_connect(self, action_result):
         """Function that handles the test connectivity action with Oauth(Authentication method).
 
@@ -814,21 +1466,18 @@ class SalesforceConnector(BaseConnector):
         self.save_progress(app_rest_url + f"/redirect?asset_id={asset_id}")
 
         # Wait for user to authorize Salesforce
-        for _ in range(0, 60):
-            state = _load_app_state(asset_id)
-            refresh_token = state.get("refresh_token")
-            if refresh_token:
-                break
-            elif state.get("error", False):
-                self.save_progress("Error retrieving refresh token")
-                _delete_app_state(asset_id)
-                return action_result.set_status(phantom.APP_ERROR)
-            time.sleep(5)
-        else:
+        state = self._wait_for_oauth_callback(asset_id)
+        if state is None:
             _delete_app_state(asset_id)
             self.save_progress("Unable to finish test connectivity due to time out")
             return action_result.set_status(phantom.APP_ERROR)
 
+        refresh_token = state.get("refresh_token")
+        if not refresh_token:
+            self.save_progress("Error retrieving refresh token")
+            _delete_app_state(asset_id)
+            return action_result.set_status(phantom.APP_ERROR)
+
         _delete_app_state(asset_id)
         # Intentionally wipe any partial/failed state from a previous run before storing the
         # newly acquired refresh token — prevents stale PKCE or error flags from carrying over.
@@ -838,26 +1487,83 @@ class SalesforceConnector(BaseConnector):
         self.save_progress("Successfully Retrieved Refresh Token")
         return phantom.APP_SUCCESS
 
-    def _handle_test_connectivity(self, param):
-        """Function that handles the test connectivity action"""
+    def _get_pinned_api_version(self, action_result):
+        """Get the URI of the API version pinned in the asset configuration, None when no version is pinned."""
 
-        action_result = self.add_action_result(ActionResult(dict(param)))
-        if self._auth_flow == self.OAUTH_FLOW:
+        api_version = (self.get_config().get("api_version") or "").strip().lstrip("vV")
+        if not api_version:
+            return phantom.APP_SUCCESS, None
+
+        if not re.fullmatch(r"\d+\.\d+", api_version):
+            return action_result.set_status(
+                phantom.APP_ERROR, "Please provide a valid API version, for example v59.0, in the 'api_version' parameter"
+            ), None
+
+        return phantom.APP_SUCCESS, f"/services/data/v{api_version}"
+
+    def _discover_api_version(self, action_result):
+        """Get the latest API version supported by the organization and cache it in the state."""
+
+        ret_val, response = self._make_rest_call_helper("/services/data/", action_result)
+        if phantom.is_fail(ret_val):
+            return ret_val, None
+
+        latest_version = response[-1]["url"]
+        self._state["latest_version"] = latest_version
+        self._state["version_checked_at"] = int(time.time())
+        return phantom.APP_SUCCESS, latest_version
+
+    def _resolve_api_version(self, action_result):
+        """Set the API version used by the action: the pinned version, the cached version, or a newly discovered one.
+
+        The latest version is looked up at most once per SALESFORCE_VERSION_CHECK_INTERVAL. When the lookup fails,
+        the previously discovered version is used.
+        """
+        ret_val, version_uri = self._get_pinned_api_version(action_result)
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        cached_version = self._state.get("latest_version")
+        if not version_uri and cached_version:
+            if time.time() - self._state.get("version_checked_at", 0) < sf_consts.SALESFORCE_VERSION_CHECK_INTERVAL:
+                version_uri = cached_version
+
+        if not version_uri:
+            # The lookup has its own action result, its error must not fail the action when the cached version is used
+            discovery_result = ActionResult()
+            ret_val, version_uri = self._discover_api_version(discovery_result)
+            if phantom.is_fail(ret_val):
+                error_message = discovery_result.get_message()
+                if not cached_version:
+                    return action_result.set_status(phantom.APP_ERROR, f"Unable to retrieve API version. Details: {error_message}")
+                self.debug_print(f"Unable to retrieve the latest API version, using {cached_version}. Details: {error_message}")
+                version_uri = cached_version
+
+        self._version_uri = version_uri
+        return phantom.APP_SUCCESS
+
+    def _handle_test_connectivity(self, param):
+        """Function that handles the test connectivity action"""
+
+        action_result = self.add_action_result(ActionResult(dict(param)))
+        if self._auth_flow == self.OAUTH_FLOW:
             ret_val = self._oauth_flow_test_connect(action_result)
             if phantom.is_fail(ret_val):
                 return ret_val
 
         self.save_progress("Obtaining API Version")
 
-        ret_val, response = self._make_rest_call_helper("/services/data/", action_result)
+        ret_val, version_uri = self._get_pinned_api_version(action_result)
         if phantom.is_fail(ret_val):
             return ret_val
 
-        latest_version = response[-1]["url"]
-        self._state["latest_version"] = latest_version
+        if not version_uri:
+            ret_val, version_uri = self._discover_api_version(action_result)
+            if phantom.is_fail(ret_val):
+                return ret_val
 
         self.save_progress("Testing API Version and Authorization Credentials...")
-        ret_val, response = self._make_rest_call_helper(latest_version, action_result)
+        ret_val, _response = self._make_rest_call_helper(version_uri, action_result)
         if phantom.is_fail(ret_val):
             return ret_val
 
@@ -865,101 +1571,929 @@ class SalesforceConnector(BaseConnector):
 
         return action_result.set_status(phantom.APP_SUCCESS)
 
-    def _get_run_query_results(self, action_result, endpoint, params):
-        done = False
-        while not done:
+    def _iter_query_pages(self, action_result, endpoint, params):
+        """Yield the records of a query one result page at a time, following nextRecordsUrl.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param endpoint: query endpoint
+            :param params: query parameters
+        Returns:
+            :return: generator of status phantom.APP_ERROR/phantom.APP_SUCCESS, list of records of the page
+        """
+        while endpoint:
             ret_val, response = self._make_rest_call_helper(endpoint, action_result, params=params)
+            if phantom.is_fail(ret_val):
+                yield RetVal(ret_val)
+                return
+
+            params = None
+            endpoint = None if response["done"] else response["nextRecordsUrl"]
+
+            yield RetVal(phantom.APP_SUCCESS, response["records"])
+
+    def _project_record(self, record, fields):
+        return {k: v for k, v in record.items() if k.lower() in fields}
+
+    def _get_run_query_results(self, action_result, endpoint, params, max_records=None, fields=None, output_file=None):
+        """Process the query results page by page, so that only a single page is kept in memory when writing to a file.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param endpoint: query endpoint
+            :param params: query parameters
+            :param max_records: maximum number of records to process
+            :param fields: list of fields to keep in every record, all the fields are kept when it is empty
+            :param output_file: file object the records are written to as NDJSON instead of being added to the action result
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message)
+        """
+        fields = {x.lower() for x in fields or []}
+        num_records = 0
+
+        for ret_val, records in self._iter_query_pages(action_result, endpoint, params):
             if phantom.is_fail(ret_val):
                 return ret_val
-            done = response["done"]
-            if not done:
-                params = None
-                endpoint = response["nextRecordsUrl"]
 
-            for record in response["records"]:
-                action_result.add_data(record)
+            if max_records:
+                records = records[: max_records - num_records]
+
+            for record in records:
+                if fields:
+                    record = self._project_record(record, fields)
+                if output_file:
+                    output_file.write(json.dumps(record) + "\n")
+                else:
+                    action_result.add_data(record)
+
+            num_records += len(records)
+            if max_records and num_records >= max_records:
+                break
+
+        action_result.update_summary({"num_objects": num_records})
+        return phantom.APP_SUCCESS
+
+    def _get_run_query_results_to_vault(self, action_result, endpoint, params, max_records=None, fields=None):
+        """Write the query results to an NDJSON file in the vault of the container."""
+
+        file_name = f"salesforce_query_{int(time.time())}.ndjson"
+        file_path = None
+        try:
+            with tempfile.NamedTemporaryFile(mode="w", dir=Vault.get_vault_tmp_dir(), suffix=".ndjson", delete=False) as output_file:
+                file_path = output_file.name
+                ret_val = self._get_run_query_results(action_result, endpoint, params, max_records, fields, output_file)
+            if phantom.is_fail(ret_val):
+                return ret_val
+
+            return self._add_file_to_vault(action_result, file_path, file_name)
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            return action_result.set_status(phantom.APP_ERROR, f"Error writing query results to the vault. {error_message}")
+        finally:
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+
+    def _add_file_to_vault(self, action_result, file_path, file_name):
+        """Add a file of the vault tmp directory to the vault of the container and add its details to the summary."""
+
+        success, message, vault_id = ph_rules.vault_add(container=self.get_container_id(), file_location=file_path, file_name=file_name)
+        if not success:
+            return action_result.set_status(phantom.APP_ERROR, f"Error adding file to the vault. {message}")
+
+        action_result.update_summary({"vault_id": vault_id, "file_name": file_name})
+        return phantom.APP_SUCCESS
+
+    def _wait_for_bulk_job(self, action_result, job_endpoint):
+        """Poll the state of a Bulk API 2.0 job, waiting longer between every check, until it is processed.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param job_endpoint: endpoint of the job
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), job details
+        """
+        wait = sf_consts.SALESFORCE_BULK_POLL_INITIAL_WAIT
+        deadline = time.time() + sf_consts.SALESFORCE_BULK_JOB_TIMEOUT
+
+        while True:
+            ret_val, response = self._make_rest_call_helper(job_endpoint, action_result)
+            if phantom.is_fail(ret_val):
+                return RetVal(ret_val)
+
+            state = response.get("state")
+            if state == "JobComplete":
+                return RetVal(phantom.APP_SUCCESS, response)
+            if state in ("Failed", "Aborted"):
+                return RetVal(action_result.set_status(phantom.APP_ERROR, f"Bulk job {state.lower()}: {response.get('errorMessage')}"))
+
+            if time.time() + wait > deadline:
+                return RetVal(action_result.set_status(phantom.APP_ERROR, f"Timed out waiting for the bulk job, last state: {state}"))
+
+            self.send_progress(f"Bulk job state: {state}. Checking again in {wait} seconds")
+            time.sleep(wait)
+            wait = min(wait * 2, sf_consts.SALESFORCE_BULK_POLL_MAX_WAIT)
+
+    def _write_bulk_results_page(self, page_file, output_file, output_format, skip_header):
+        """Append a CSV result page of a bulk query job to the output file, converting it to NDJSON if needed."""
+
+        page = io.TextIOWrapper(page_file, encoding="utf-8", newline="")
+        if output_format == "ndjson":
+            for row in csv.DictReader(page):
+                output_file.write(json.dumps(row) + "\n")
+            return
+
+        if skip_header:
+            # Every page starts with the header row, it is only kept for the first page
+            next(page, None)
+        for line in page:
+            output_file.write(line)
+
+    def _download_bulk_query_results(self, action_result, results_endpoint, output_file, output_format):
+        """Download the result pages of a bulk query job one at a time into the output file.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param results_endpoint: results endpoint of the job
+            :param output_file: text file object the results are written to
+            :param output_format: csv or ndjson
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), number of records
+        """
+        params = {"maxRecords": sf_consts.SALESFORCE_BULK_RESULTS_PAGE_SIZE}
+        num_records = 0
+        first_page = True
+
+        while True:
+            with tempfile.TemporaryFile(dir=Vault.get_vault_tmp_dir()) as page_file:
+                ret_val, headers = self._make_rest_call_helper(results_endpoint, action_result, params=params, output_file=page_file)
+                if phantom.is_fail(ret_val):
+                    return RetVal(ret_val)
+
+                page_file.seek(0)
+                self._write_bulk_results_page(page_file, output_file, output_format, skip_header=not first_page)
+
+            num_records += int(headers.get("Sforce-NumberOfRecords", 0))
+
+            # The locator of the next page is "null" once the last page was returned
+            locator = headers.get("Sforce-Locator")
+            if not locator or locator == "null":
+                break
+
+            params = {"maxRecords": sf_consts.SALESFORCE_BULK_RESULTS_PAGE_SIZE, "locator": locator}
+            first_page = False
+
+        return RetVal(phantom.APP_SUCCESS, num_records)
+
+    def _handle_run_bulk_query(self, param):
+        action_result = self.add_action_result(ActionResult(dict(param)))
+        self.debug_print("run bulk query called")
+
+        operation = param.get("endpoint", "query")
+        output_format = param.get("output_format", "csv")
+        if output_format not in ("csv", "ndjson"):
+            return action_result.set_status(phantom.APP_ERROR, "Please provide a valid value in the 'output_format' parameter")
+
+        data = {"operation": operation, "query": param["query"]}
+        endpoint = sf_consts.API_ENDPOINT_BULK_QUERY_JOBS.format(version=self._version_uri)
+        ret_val, response = self._make_rest_call_helper(endpoint, action_result, json=data, method="post")
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        job_id = response["id"]
+        action_result.update_summary({"job_id": job_id})
+        self.save_progress(f"Created bulk query job {job_id}")
+
+        job_endpoint = sf_consts.API_ENDPOINT_BULK_QUERY_JOB.format(version=self._version_uri, job_id=job_id)
+        ret_val, _job = self._wait_for_bulk_job(action_result, job_endpoint)
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        file_name = f"salesforce_bulk_query_{job_id}.{output_format}"
+        file_path = None
+        try:
+            with tempfile.NamedTemporaryFile(
+                mode="w", dir=Vault.get_vault_tmp_dir(), suffix=f".{output_format}", delete=False, encoding="utf-8", newline=""
+            ) as output_file:
+                file_path = output_file.name
+                ret_val, num_records = self._download_bulk_query_results(action_result, f"{job_endpoint}results", output_file, output_format)
+            if phantom.is_fail(ret_val):
+                return ret_val
+
+            ret_val = self._add_file_to_vault(action_result, file_path, file_name)
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            return action_result.set_status(phantom.APP_ERROR, f"Error writing bulk query results to the vault. {error_message}")
+        finally:
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        action_result.update_summary({"num_objects": num_records})
+        return action_result.set_status(phantom.APP_SUCCESS, "Successfully retrieved bulk query results")
+
+    def _handle_run_query(self, param):
+        action_result = self.add_action_result(ActionResult(dict(param)))
+        self.debug_print("run query called")
+        query = param["query"]
+        query_type = param.get("endpoint", "query")
+
+        endpoint = sf_consts.API_ENDPOINT_RUN_QUERY.format(version=self._version_uri, query_type=query_type)
+        # Replace all spaces with a '+' sign for URL param
+        query = " ".join(query.split()).replace(" ", "+")
+        # Pass a string to avoid getting the '+' url encoded
+        params = f"q={query}"
+
+        # validate max_records parameter
+        ret_val, max_records = self._validate_integers(action_result, param.get("max_records"), "max_records")
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        ret_val, fields = self._parse_field_names(action_result, param.get("fields"), "fields")
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        if param.get("write_to_vault", False):
+            ret_val = self._get_run_query_results_to_vault(action_result, endpoint, params, max_records, fields)
+        else:
+            ret_val = self._get_run_query_results(action_result, endpoint, params, max_records, fields)
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        return action_result.set_status(phantom.APP_SUCCESS, "Successfully retrieved query results")
+
+    def _get_describe_cache_path(self, sobject):
+        name = sobject or "global"
+        return os.path.join(self.get_state_dir(), f"{self.get_asset_id()}_describe_{name}.json")
+
+    def _load_describe_cache(self, sobject):
+        try:
+            with open(self._get_describe_cache_path(sobject)) as cache_file:
+                return json.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            self.debug_print(f"Unable to load the describe cache of {sobject or 'global describe'}. {error_message}")
+            return None
+
+    def _save_describe_cache(self, sobject, cache):
+        try:
+            with open(self._get_describe_cache_path(sobject), "w") as cache_file:
+                json.dump(cache, cache_file)
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            self.debug_print(f"Unable to save the describe cache of {sobject or 'global describe'}. {error_message}")
+
+    def _get_describe(self, action_result, sobject=None):
+        """Get the describe of an sObject, or the global describe, from the on-disk cache of the asset.
+
+        Expired entries are revalidated with If-Modified-Since, so an unchanged schema is not downloaded again.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param sobject: name of the Salesforce object, the global describe is returned when it is empty
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), describe, whether it came from the cache
+        """
+        if sobject and not re.fullmatch(sf_consts.SALESFORCE_FIELD_NAME_REGEX, sobject):
+            return action_result.set_status(phantom.APP_ERROR, f"Invalid object name '{sobject}'"), None, False
+
+        cache = self._load_describe_cache(sobject)
+        if cache and time.time() - cache["fetched_at"] < sf_consts.SALESFORCE_DESCRIBE_CACHE_TTL:
+            return phantom.APP_SUCCESS, cache["describe"], True
+
+        if sobject:
+            endpoint = sf_consts.API_ENDPOINT_DESCRIBE_OBJECT.format(version=self._version_uri, sobject=sobject)
+        else:
+            endpoint = sf_consts.API_ENDPOINT_DESCRIBE_GLOBAL.format(version=self._version_uri)
+
+        headers = {"If-Modified-Since": cache["last_modified"]} if cache else None
+        ret_val, response = self._make_rest_call_helper(endpoint, action_result, headers=headers)
+        if phantom.is_fail(ret_val):
+            return ret_val, None, False
+
+        now = time.time()
+        if response is None:
+            # Not modified since it was cached
+            cache["fetched_at"] = now
+        else:
+            cache = {"fetched_at": now, "last_modified": formatdate(now, usegmt=True), "describe": response}
+        self._save_describe_cache(sobject, cache)
+
+        return phantom.APP_SUCCESS, cache["describe"], response is None
+
+    def _validate_field_names(self, action_result, sobject, field_values):
+        """Reject field names that are not part of the sObject before sending a create or update request.
+
+        The validation is skipped when the describe of the object can not be retrieved, Salesforce then validates the request.
+        Relationship names are accepted too, to set a lookup field from the external ID of the related object.
+        """
+        if not isinstance(field_values, dict):
+            return action_result.set_status(phantom.APP_ERROR, "The field values must be a JSON object of field names and values")
+
+        ret_val, describe, _from_cache = self._get_describe(ActionResult(), sobject)
+        if phantom.is_fail(ret_val):
+            self.debug_print(f"Unable to get the describe of {sobject}, skipping the validation of the field names")
+            return phantom.APP_SUCCESS
+
+        valid_names = set()
+        for field in describe.get("fields", []):
+            valid_names.add(field["name"].lower())
+            if field.get("relationshipName"):
+                valid_names.add(field["relationshipName"].lower())
+        invalid_names = [str(name) for name in field_values if not isinstance(name, str) or name.lower() not in valid_names]
+        if invalid_names:
+            return action_result.set_status(phantom.APP_ERROR, "Invalid field names for {}: {}".format(sobject, ", ".join(invalid_names)))
+
+        return phantom.APP_SUCCESS
+
+    def _list_record_files(self, action_result, record_id):
+        """List the files of a record: the latest versions of the Files linked to it and its classic Attachments.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param record_id: ID of the record
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), list of file details
+        """
+        files = []
+
+        query = (
+            "SELECT Id, Title, FileExtension, ContentSize, Checksum FROM ContentVersion WHERE IsLatest = true AND ContentDocumentId IN "
+            f"(SELECT ContentDocumentId FROM ContentDocumentLink WHERE LinkedEntityId = '{record_id}')"
+        )
+        ret_val, records = self._get_query_records(action_result, query)
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val)
+
+        for record in records:
+            file_name = record["Title"]
+            extension = record.get("FileExtension")
+            if extension and not file_name.lower().endswith(f".{extension.lower()}"):
+                file_name = f"{file_name}.{extension}"
+
+            files.append(
+                {
+                    "type": "ContentVersion",
+                    "id": record["Id"],
+                    "name": file_name,
+                    "size": record.get("ContentSize"),
+                    "checksum": record.get("Checksum"),
+                    "endpoint": sf_consts.API_ENDPOINT_CONTENT_VERSION_DATA.format(version=self._version_uri, id=record["Id"]),
+                }
+            )
+
+        ret_val, records = self._get_query_records(action_result, f"SELECT Id, Name, BodyLength FROM Attachment WHERE ParentId = '{record_id}'")
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val)
+
+        for record in records:
+            files.append(
+                {
+                    "type": "Attachment",
+                    "id": record["Id"],
+                    "name": record["Name"],
+                    "size": record.get("BodyLength"),
+                    # Attachments have no checksum field, they are checked against the vault once downloaded
+                    "checksum": None,
+                    "endpoint": sf_consts.API_ENDPOINT_ATTACHMENT_BODY.format(version=self._version_uri, id=record["Id"]),
+                }
+            )
+
+        return RetVal(phantom.APP_SUCCESS, files)
+
+    def _download_file(self, file_details, byte_limiter):
+        """Stream a file to the vault tmp directory, chunk by chunk.
+
+        Runs in a worker thread, so it uses its own action result instead of the action's one.
+
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, path of the downloaded file or the error message, HashingWriter
+        """
+        action_result = ActionResult()
+        file_path = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=Vault.get_vault_tmp_dir(), delete=False) as output_file:
+                file_path = output_file.name
+                writer = HashingWriter(output_file, byte_limiter)
+                ret_val, _headers = self._make_rest_call_helper(file_details["endpoint"], action_result, output_file=writer)
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            ret_val = action_result.set_status(phantom.APP_ERROR, f"Error writing the file. {error_message}")
+
+        if phantom.is_fail(ret_val):
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+            return phantom.APP_ERROR, action_result.get_message(), None
+
+        return phantom.APP_SUCCESS, file_path, writer
+
+    def _get_vault_checksums(self, container_id):
+        """Get the checksums of the files already in the vault of the container."""
+
+        checksums = set()
+        success, message, vault_files = ph_rules.vault_info(container_id=container_id)
+        if not success:
+            self.debug_print(f"Unable to list the files of the vault of container {container_id}. {message}")
+            return checksums
+
+        for vault_file in vault_files or []:
+            metadata = vault_file.get("metadata") or {}
+            checksums.update((vault_file.get("vault_id"), metadata.get("md5"), metadata.get("sha1")))
+        checksums.discard(None)
+        return checksums
+
+    def _save_record_files(self, action_result, record_id, container_id, concurrency, byte_limiter):
+        """Stream the files of a record into the vault of a container, skipping the files already in the vault.
+
+        Files are downloaded in parallel and added to the vault from this thread. The checksum of Files is known
+        before they are downloaded, Attachments are checked against the vault once downloaded.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param record_id: ID of the record
+            :param container_id: ID of the container the files are added to
+            :param concurrency: number of files downloaded in parallel
+            :param byte_limiter: TokenBucket limiting the number of bytes downloaded per second
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), list of file details
+        """
+        ret_val, files = self._list_record_files(action_result, record_id)
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val)
+
+        checksums = self._get_vault_checksums(container_id) if files else set()
+        downloads = []
+        for file_details in files:
+            file_details["skipped"] = bool(file_details["checksum"] and file_details["checksum"] in checksums)
+            if not file_details["skipped"]:
+                downloads.append(file_details)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda file_details: self._download_file(file_details, byte_limiter), downloads))
+
+        for file_details, (ret_val, file_path, writer) in zip(downloads, results):
+            if phantom.is_fail(ret_val):
+                file_details["error"] = file_path
+                continue
+
+            try:
+                md5 = writer.md5.hexdigest()
+                sha1 = writer.sha1.hexdigest()
+                file_details["downloaded_bytes"] = writer.size
+                if md5 in checksums or sha1 in checksums:
+                    file_details["skipped"] = True
+                    continue
+
+                success, message, vault_id = ph_rules.vault_add(container=container_id, file_location=file_path, file_name=file_details["name"])
+                if not success:
+                    file_details["error"] = f"Error adding file to the vault. {message}"
+                    continue
+
+                file_details["vault_id"] = vault_id
+                # The same content may be attached several times to the record
+                checksums.update((md5, sha1))
+            finally:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+
+        for file_details in files:
+            file_details.pop("endpoint")
+
+        return RetVal(phantom.APP_SUCCESS, files)
+
+    def _get_download_settings(self, action_result):
+        """Get the number of parallel downloads and the TokenBucket limiting the download rate of the asset.
+
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), concurrency, TokenBucket
+        """
+        config = self.get_config()
+
+        # validate attachment_download_concurrency parameter
+        ret_val, concurrency = self._validate_integers(
+            action_result,
+            config.get("attachment_download_concurrency", sf_consts.SALESFORCE_DEFAULT_DOWNLOAD_CONCURRENCY),
+            "attachment_download_concurrency",
+        )
+        if phantom.is_fail(ret_val):
+            return ret_val, None, None
+
+        # validate attachment_max_bytes_per_second parameter
+        ret_val, max_rate = self._validate_integers(
+            action_result, config.get("attachment_max_bytes_per_second", 0), "attachment_max_bytes_per_second", allow_zero=True
+        )
+        if phantom.is_fail(ret_val):
+            return ret_val, None, None
+
+        # A chunk is written at once, the bucket must be able to hold one
+        return phantom.APP_SUCCESS, concurrency, TokenBucket(max_rate, max(max_rate, sf_consts.SALESFORCE_STREAM_CHUNK_SIZE))
+
+    def _handle_get_attachments(self, param):
+        action_result = self.add_action_result(ActionResult(dict(param)))
+        self.debug_print("get attachments called")
+        record_id = param["id"]
+
+        if not re.fullmatch(sf_consts.SALESFORCE_OBJECT_ID_REGEX, record_id):
+            return action_result.set_status(phantom.APP_ERROR, "Please provide a valid Salesforce Object ID in the 'id' parameter")
+
+        ret_val, concurrency, byte_limiter = self._get_download_settings(action_result)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        ret_val, files = self._save_record_files(action_result, record_id, self.get_container_id(), concurrency, byte_limiter)
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        for file_details in files:
+            action_result.add_data(file_details)
+
+        num_failed = len([x for x in files if x.get("error")])
+        action_result.update_summary(
+            {
+                "num_files": len(files),
+                "num_saved": len([x for x in files if x.get("vault_id")]),
+                "num_skipped": len([x for x in files if x["skipped"]]),
+                "num_failed": num_failed,
+                "downloaded_bytes": sum(x.get("downloaded_bytes", 0) for x in files),
+            }
+        )
+
+        if num_failed:
+            return action_result.set_status(phantom.APP_ERROR, f"Unable to save {num_failed} of the {len(files)} files to the vault")
+
+        return action_result.set_status(phantom.APP_SUCCESS, f"Successfully saved the files of {record_id} to the vault")
+
+    def _handle_describe_object(self, param):
+        action_result = self.add_action_result(ActionResult(dict(param)))
+        self.debug_print("describe object called")
+        sobject = param.get("sobject")
+
+        ret_val, describe, from_cache = self._get_describe(action_result, sobject)
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        action_result.add_data(describe)
+        if sobject:
+            action_result.update_summary({"num_fields": len(describe.get("fields", [])), "from_cache": from_cache})
+            return action_result.set_status(phantom.APP_SUCCESS, f"Successfully retrieved the describe of {sobject}")
+
+        action_result.update_summary({"num_sobjects": len(describe.get("sobjects", [])), "from_cache": from_cache})
+        return action_result.set_status(phantom.APP_SUCCESS, "Successfully retrieved the global describe")
+
+    def _create_object(self, action_result, param, field_values):
+        self.debug_print("create object called")
+        sobject = param.get("sobject", "Case")
+
+        ret_val = self._validate_field_names(action_result, sobject, field_values)
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        endpoint = sf_consts.API_ENDPOINT_OBJECT.format(version=self._version_uri, sobject=sobject)
+
+        ret_val, response = self._make_rest_call_helper(endpoint, action_result, json=field_values, method="post")
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        action_result.add_data(response)
+        summary = action_result.update_summary({})
+        summary["obj_id"] = response["id"]
+
+        return action_result.set_status(phantom.APP_SUCCESS, f"Successfully created a new {sobject}")
+
+    def _handle_create_object(self, param):
+        action_result = self.add_action_result(ActionResult(dict(param)))
+        other = param["field_values"]
+        try:
+            other_dict = json.loads(other)
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            return action_result.set_status(phantom.APP_ERROR, "Error reading 'field_values'", error_message)
+
+        return self._create_object(action_result, param, other_dict)
+
+    def _handle_create_ticket(self, param):
+        action_result = self.add_action_result(ActionResult(dict(param)))
+        self.debug_print("create ticket called")
+
+        other = param.get("field_values")
+        if other:
+            try:
+                other_dict = json.loads(other)
+            except Exception as e:
+                error_message = self._get_error_message_from_exception(e)
+                return action_result.set_status(phantom.APP_ERROR, "Error reading 'field_values'", error_message)
+        else:
+            other_dict = {}
+
+        for k, v in list(param.items()):
+            if k in sf_consts.CASE_FIELD_MAP:
+                other_dict[sf_consts.CASE_FIELD_MAP[k]] = v
+
+        return self._create_object(action_result, param, other_dict)
+
+    def _delete_object(self, param):
+        action_result = self.add_action_result(ActionResult(dict(param)))
+        self.debug_print("delete object called")
+        sobject = param.get("sobject", "Case")
+        obj_id = param["id"]
+
+        endpoint = sf_consts.API_ENDPOINT_OBJECT_ID.format(version=self._version_uri, sobject=sobject, id=obj_id)
+
+        ret_val, _response = self._make_rest_call_helper(endpoint, action_result, method="delete")
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        return action_result.set_status(phantom.APP_SUCCESS, f"Successfully deleted the {sobject}")
+
+    def _parse_bulk_records(self, action_result, param, operation):
+        """Parse the records of a bulk action, a JSON list of field values or a comma-separated list of IDs for deletions.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param param: dictionary of input parameters
+            :param operation: insert, update or delete
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), list of records
+        """
+        if operation == "delete":
+            ids = [x.strip() for x in param["ids"].split(",") if x.strip()]
+            if not ids:
+                return RetVal(action_result.set_status(phantom.APP_ERROR, "Please provide at least one ID in the 'ids' parameter"))
+            return RetVal(phantom.APP_SUCCESS, [{"Id": x} for x in ids])
+
+        try:
+            records = json.loads(param["records"])
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            return RetVal(action_result.set_status(phantom.APP_ERROR, "Error reading 'records'", error_message))
+
+        if not isinstance(records, list) or not records or not all(isinstance(x, dict) for x in records):
+            return RetVal(
+                action_result.set_status(phantom.APP_ERROR, "Please provide a non-empty JSON list of objects in the 'records' parameter")
+            )
+
+        if operation == "update" and not all(x.get("Id") for x in records):
+            return RetVal(action_result.set_status(phantom.APP_ERROR, "Every record of the 'records' parameter must contain its 'Id'"))
+
+        return RetVal(phantom.APP_SUCCESS, records)
+
+    def _bulk_modify_with_collections(self, action_result, sobject, operation, records, all_or_none):
+        """Create, update or delete records with the sObject Collections API, in requests of up to 200 records.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param sobject: name of the Salesforce object
+            :param operation: insert, update or delete
+            :param records: list of records
+            :param all_or_none: roll back the whole request when a record fails
+        Returns:
+            :return: status phantom.APP_SUCCESS, list of per record results, the records of a failed request are reported as failed
+        """
+        endpoint = sf_consts.API_ENDPOINT_COLLECTIONS.format(version=self._version_uri)
+        chunk_size = sf_consts.SALESFORCE_COLLECTIONS_CHUNK_SIZE
+        results = []
+
+        for index in range(0, len(records), chunk_size):
+            chunk = records[index : index + chunk_size]
+            if operation == "delete":
+                params = {"ids": ",".join(x["Id"] for x in chunk), "allOrNone": str(all_or_none).lower()}
+                ret_val, response = self._make_rest_call_helper(endpoint, action_result, params=params, method="delete")
+            else:
+                data = {"allOrNone": all_or_none, "records": [{"attributes": {"type": sobject}, **x} for x in chunk]}
+                method = "post" if operation == "insert" else "patch"
+                ret_val, response = self._make_rest_call_helper(endpoint, action_result, json=data, method=method)
+
+            # The previous chunks are already committed, so their results are kept and the next chunks are still sent
+            if phantom.is_fail(ret_val):
+                errors = [{"message": action_result.get_message()}]
+                results.extend({"id": record.get("Id"), "success": False, "errors": errors} for record in chunk)
+                continue
+
+            # The API returns one result per record, in the order of the request
+            for record, result in zip(chunk, response):
+                results.append(
+                    {"id": result.get("id") or record.get("Id"), "success": result.get("success"), "errors": result.get("errors", [])}
+                )
+
+        return RetVal(phantom.APP_SUCCESS, results)
+
+    def _flatten_record(self, record, prefix=""):
+        """Flatten the related objects of a record to Rel.Field columns, the CSV format of the relationship fields."""
+        row = {}
+        for key, value in record.items():
+            if isinstance(value, dict):
+                row.update(self._flatten_record(value, f"{prefix}{key}."))
+            elif value is None:
+                # Bulk API 2.0 ignores empty cells, #N/A sets the field to null
+                row[f"{prefix}{key}"] = "#N/A"
+            else:
+                row[f"{prefix}{key}"] = str(value).lower() if isinstance(value, bool) else value
+        return row
+
+    def _records_to_csv(self, records):
+        rows = [self._flatten_record(record) for record in records]
+        columns = list(dict.fromkeys(k for row in rows for k in row))
+
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=columns, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+
+        return output.getvalue()
+
+    def _get_bulk_ingest_results(self, action_result, job_endpoint, result_type):
+        """Get the successful or failed records of a bulk ingest job as a list of dictionaries."""
+
+        with io.BytesIO() as output_file:
+            ret_val, _headers = self._make_rest_call_helper(f"{job_endpoint}{result_type}/", action_result, output_file=output_file)
+            if phantom.is_fail(ret_val):
+                return RetVal(ret_val)
+            content = output_file.getvalue().decode("utf-8")
+
+        return RetVal(phantom.APP_SUCCESS, list(csv.DictReader(io.StringIO(content))))
+
+    def _bulk_modify_with_ingest_job(self, action_result, sobject, operation, records):
+        """Create, update or delete records with a Bulk API 2.0 ingest job.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param sobject: name of the Salesforce object
+            :param operation: insert, update or delete
+            :param records: list of records
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), list of per record results
+        """
+        endpoint = sf_consts.API_ENDPOINT_BULK_INGEST_JOBS.format(version=self._version_uri)
+        data = {"object": sobject, "operation": operation, "contentType": "CSV", "lineEnding": "LF"}
+        ret_val, response = self._make_rest_call_helper(endpoint, action_result, json=data, method="post")
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val)
+
+        job_id = response["id"]
+        action_result.update_summary({"job_id": job_id})
+        self.save_progress(f"Created bulk ingest job {job_id}")
+
+        job_endpoint = sf_consts.API_ENDPOINT_BULK_INGEST_JOB.format(version=self._version_uri, job_id=job_id)
+        ret_val, _response = self._make_rest_call_helper(
+            f"{job_endpoint}batches/",
+            action_result,
+            data=self._records_to_csv(records).encode("utf-8"),
+            headers={"Content-Type": "text/csv"},
+            method="put",
+        )
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val)
+
+        ret_val, _response = self._make_rest_call_helper(job_endpoint, action_result, json={"state": "UploadComplete"}, method="patch")
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val)
+
+        ret_val, _job = self._wait_for_bulk_job(action_result, job_endpoint)
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val)
+
+        results = []
+        for result_type in ("successfulResults", "failedResults"):
+            ret_val, rows = self._get_bulk_ingest_results(action_result, job_endpoint, result_type)
+            if phantom.is_fail(ret_val):
+                return RetVal(ret_val)
+
+            for row in rows:
+                error = row.get("sf__Error")
+                results.append({"id": row.get("sf__Id") or row.get("Id"), "success": not error, "errors": [{"message": error}] if error else []})
 
-        action_result.update_summary({"num_objects": action_result.get_data_size()})
-        return phantom.APP_SUCCESS
+        return RetVal(phantom.APP_SUCCESS, results)
 
-    def _handle_run_query(self, param):
+    def _bulk_modify_objects(self, param, operation):
         action_result = self.add_action_result(ActionResult(dict(param)))
-        self.debug_print("run query called")
-        query = param["query"]
-        query_type = param.get("endpoint", "query")
+        self.debug_print(f"bulk {operation} called")
+        sobject = param.get("sobject", "Case")
+        all_or_none = param.get("all_or_none", False)
 
-        endpoint = sf_consts.API_ENDPOINT_RUN_QUERY.format(version=self._version_uri, query_type=query_type)
-        # Replace all spaces with a '+' sign for URL param
-        query = " ".join(query.split()).replace(" ", "+")
-        # Pass a string to avoid getting the '+' url encoded
-        params = f"q={query}"
+        ret_val, records = self._parse_bulk_records(action_result, param, operation)
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        # The rollback of a collections request only covers its own chunk and Bulk API jobs always commit the records that succeed
+        if all_or_none and len(records) > sf_consts.SALESFORCE_COLLECTIONS_CHUNK_SIZE:
+            return action_result.set_status(
+                phantom.APP_ERROR, f"'all_or_none' is only supported for up to {sf_consts.SALESFORCE_COLLECTIONS_CHUNK_SIZE} records"
+            )
 
-        ret_val = self._get_run_query_results(action_result, endpoint, params)
+        if len(records) <= sf_consts.SALESFORCE_COLLECTIONS_MAX_RECORDS:
+            ret_val, results = self._bulk_modify_with_collections(action_result, sobject, operation, records, all_or_none)
+        else:
+            ret_val, results = self._bulk_modify_with_ingest_job(action_result, sobject, operation, records)
         if phantom.is_fail(ret_val):
             return ret_val
 
-        return action_result.set_status(phantom.APP_SUCCESS, "Successfully retrieved query results")
+        for result in results:
+            action_result.add_data(result)
 
-    def _create_object(self, action_result, param, field_values):
-        self.debug_print("create object called")
-        sobject = param.get("sobject", "Case")
+        num_success = sum(1 for x in results if x["success"])
+        action_result.update_summary({"num_success": num_success, "num_failed": len(results) - num_success})
 
-        endpoint = sf_consts.API_ENDPOINT_OBJECT.format(version=self._version_uri, sobject=sobject)
+        if not num_success:
+            return action_result.set_status(phantom.APP_ERROR, f"Unable to {operation} any {sobject} record")
 
-        ret_val, response = self._make_rest_call_helper(endpoint, action_result, json=field_values, method="post")
-        if phantom.is_fail(ret_val):
-            return ret_val
+        if num_success < len(results):
+            return action_result.set_status(
+                phantom.APP_SUCCESS, f"Processed the bulk {operation} of {sobject} records, {len(results) - num_success} records failed"
+            )
 
-        action_result.add_data(response)
-        summary = action_result.update_summary({})
-        summary["obj_id"] = response["id"]
+        return action_result.set_status(phantom.APP_SUCCESS, f"Successfully processed the bulk {operation} of {sobject} records")
 
-        return action_result.set_status(phantom.APP_SUCCESS, f"Successfully created a new {sobject}")
+    def _handle_bulk_create_objects(self, param):
+        return self._bulk_modify_objects(param, "insert")
 
-    def _handle_create_object(self, param):
-        action_result = self.add_action_result(ActionResult(dict(param)))
-        other = param["field_values"]
+    def _handle_bulk_update_objects(self, param):
+        return self._bulk_modify_objects(param, "update")
+
+    def _handle_bulk_delete_objects(self, param):
+        return self._bulk_modify_objects(param, "delete")
+
+    def _parse_composite_requests(self, action_result, param, max_requests):
+        """Parse the subrequests of the run composite action and prefix their relative URLs with the API version.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param param: dictionary of input parameters
+            :param max_requests: maximum number of subrequests
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), list of subrequests
+        """
         try:
-            other_dict = json.loads(other)
+            subrequests = json.loads(param["requests"])
         except Exception as e:
             error_message = self._get_error_message_from_exception(e)
-            return action_result.set_status(phantom.APP_ERROR, "Error reading 'field_values'", error_message)
+            return RetVal(action_result.set_status(phantom.APP_ERROR, "Error reading 'requests'", error_message))
 
-        return self._create_object(action_result, param, other_dict)
+        if not isinstance(subrequests, list) or not subrequests or not all(isinstance(x, dict) for x in subrequests):
+            return RetVal(
+                action_result.set_status(phantom.APP_ERROR, "Please provide a non-empty JSON list of objects in the 'requests' parameter")
+            )
 
-    def _handle_create_ticket(self, param):
-        action_result = self.add_action_result(ActionResult(dict(param)))
-        self.debug_print("create ticket called")
+        if len(subrequests) > max_requests:
+            return RetVal(action_result.set_status(phantom.APP_ERROR, f"A maximum of {max_requests} subrequests is supported"))
 
-        other = param.get("field_values")
-        if other:
-            try:
-                other_dict = json.loads(other)
-            except Exception as e:
-                error_message = self._get_error_message_from_exception(e)
-                return action_result.set_status(phantom.APP_ERROR, "Error reading 'field_values'", error_message)
-        else:
-            other_dict = {}
+        composite_request = []
+        for index, subrequest in enumerate(subrequests):
+            if not subrequest.get("method") or not subrequest.get("url"):
+                return RetVal(action_result.set_status(phantom.APP_ERROR, f"Subrequest {index} must contain a 'method' and a 'url'"))
 
-        for k, v in list(param.items()):
-            if k in sf_consts.CASE_FIELD_MAP:
-                other_dict[sf_consts.CASE_FIELD_MAP[k]] = v
+            subrequest = dict(subrequest)
+            subrequest.setdefault("referenceId", f"ref{index}")
+            # Allow URLs relative to the API version, for example sobjects/Case
+            if not subrequest["url"].startswith("/services/"):
+                subrequest["url"] = "{}/{}".format(self._version_uri, subrequest["url"].lstrip("/"))
+            composite_request.append(subrequest)
 
-        return self._create_object(action_result, param, other_dict)
+        return RetVal(phantom.APP_SUCCESS, composite_request)
 
-    def _delete_object(self, param):
+    def _handle_run_composite(self, param):
         action_result = self.add_action_result(ActionResult(dict(param)))
-        self.debug_print("delete object called")
-        sobject = param.get("sobject", "Case")
-        obj_id = param["id"]
+        self.debug_print("run composite called")
 
-        endpoint = sf_consts.API_ENDPOINT_OBJECT_ID.format(version=self._version_uri, sobject=sobject, id=obj_id)
+        composite_type = param.get("composite_type", "composite")
+        if composite_type not in ("composite", "graph"):
+            return action_result.set_status(phantom.APP_ERROR, "Please provide a valid value in the 'composite_type' parameter")
 
-        ret_val, _response = self._make_rest_call_helper(endpoint, action_result, method="delete")
+        max_requests = (
+            sf_consts.SALESFORCE_COMPOSITE_GRAPH_MAX_REQUESTS if composite_type == "graph" else sf_consts.SALESFORCE_COMPOSITE_MAX_REQUESTS
+        )
+        ret_val, composite_request = self._parse_composite_requests(action_result, param, max_requests)
         if phantom.is_fail(ret_val):
             return ret_val
 
-        return action_result.set_status(phantom.APP_SUCCESS, f"Successfully deleted the {sobject}")
+        if composite_type == "graph":
+            # A graph is always processed as a single transaction
+            endpoint = sf_consts.API_ENDPOINT_COMPOSITE_GRAPH.format(version=self._version_uri)
+            data = {"graphs": [{"graphId": "graph", "compositeRequest": composite_request}]}
+        else:
+            endpoint = sf_consts.API_ENDPOINT_COMPOSITE.format(version=self._version_uri)
+            data = {"allOrNone": param.get("all_or_none", False), "compositeRequest": composite_request}
+
+        ret_val, response = self._make_rest_call_helper(endpoint, action_result, json=data, method="post")
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        if composite_type == "graph":
+            response = response["graphs"][0]["graphResponse"]
+
+        num_failed = 0
+        for subresponse in response["compositeResponse"]:
+            status_code = subresponse.get("httpStatusCode")
+            if not status_code or status_code >= 400:
+                num_failed += 1
+            action_result.add_data({"reference_id": subresponse.get("referenceId"), "status_code": status_code, "body": subresponse.get("body")})
+
+        action_result.update_summary({"num_subrequests": action_result.get_data_size(), "num_failed": num_failed})
+
+        if num_failed:
+            return action_result.set_status(phantom.APP_ERROR, f"{num_failed} subrequests failed")
+
+        return action_result.set_status(phantom.APP_SUCCESS, "Successfully ran the composite request")
 
     def _handle_delete_object(self, param):
         return self._delete_object(param)
@@ -973,6 +2507,10 @@ class SalesforceConnector(BaseConnector):
         sobject = param.get("sobject", "Case")
         obj_id = param["id"]
 
+        ret_val = self._validate_field_names(action_result, sobject, field_values)
+        if phantom.is_fail(ret_val):
+            return ret_val
+
         endpoint = sf_consts.API_ENDPOINT_OBJECT_ID.format(version=self._version_uri, sobject=sobject, id=obj_id)
 
         ret_val, response = self._make_rest_call_helper(endpoint, action_result, json=field_values, method="patch")
@@ -1019,7 +2557,7 @@ class SalesforceConnector(BaseConnector):
 
         return self._update_object(action_result, param, other_dict)
 
-    def _get_listview_results_url(self, action_result, endpoint, view_name):
+    def _find_listview(self, action_result, endpoint, view_name):
         found_views = []
         done = False
 
@@ -1033,12 +2571,49 @@ class SalesforceConnector(BaseConnector):
 
             for view in response["listviews"]:
                 if view_name and view["developerName"] == view_name:
-                    return phantom.APP_SUCCESS, view["resultsUrl"], None
+                    return phantom.APP_SUCCESS, view, None
                 found_views.append(view["developerName"])
 
         # Was not able to find view
         return phantom.APP_SUCCESS, None, found_views
 
+    def _get_listview(self, action_result, sobject, view_name):
+        """Get a list view by developer name, from the list view cache of the asset when possible.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param sobject: name of the Salesforce object
+            :param view_name: developer name of the list view
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), list view (None when not found),
+        names of the list views of the object when it was not found, whether it came from the cache
+        """
+        cache_key = f"{self._version_uri}|{sobject}|{view_name}"
+        cached_view = self._state.get("listview_cache", {}).get(cache_key)
+        if cached_view and time.time() - cached_view["cached_at"] < sf_consts.SALESFORCE_LISTVIEW_CACHE_TTL:
+            return phantom.APP_SUCCESS, cached_view, None, True
+
+        endpoint = sf_consts.API_ENDPOINT_GET_LISTVIEWS.format(version=self._version_uri, sobject=sobject)
+        ret_val, view, views = self._find_listview(action_result, endpoint, view_name)
+        if phantom.is_fail(ret_val) or not view:
+            return ret_val, None, views, False
+
+        view = {k: view.get(k) for k in ("id", "developerName", "resultsUrl", "describeUrl")}
+        view["cached_at"] = int(time.time())
+        self._state.setdefault("listview_cache", {})[cache_key] = view
+        return phantom.APP_SUCCESS, view, None, False
+
+    def _invalidate_listview(self, action_result, sobject, view_name):
+        """Remove a list view from the cache when the request made with it failed because it does not exist anymore.
+
+        :return: whether the list view was removed from the cache
+        """
+        if "NOT_FOUND" not in action_result.get_message():
+            return False
+
+        cache_key = f"{self._version_uri}|{sobject}|{view_name}"
+        return self._state.get("listview_cache", {}).pop(cache_key, None) is not None
+
     def _mogrify_record(self, record):
         # Transform a list of JSON objects into a dictionary
         columns = record["columns"]
@@ -1084,19 +2659,22 @@ class SalesforceConnector(BaseConnector):
         sobject = param.get("sobject", "Case")
         view_name = param.get("view_name")
 
-        endpoint = sf_consts.API_ENDPOINT_GET_LISTVIEWS.format(version=self._version_uri, sobject=sobject)
+        if not view_name:
+            # Just return a list of valid views
+            endpoint = sf_consts.API_ENDPOINT_GET_LISTVIEWS.format(version=self._version_uri, sobject=sobject)
+            ret_val, _view, views = self._find_listview(action_result, endpoint, view_name)
+            if phantom.is_fail(ret_val):
+                return ret_val
+            action_result.update_summary({"view_names": views})
+            return action_result.set_status(phantom.APP_SUCCESS, "Listed the valid view names")
 
-        ret_val, results_url, views = self._get_listview_results_url(action_result, endpoint, view_name)
+        ret_val, view, views, from_cache = self._get_listview(action_result, sobject, view_name)
         if phantom.is_fail(ret_val):
             return ret_val
-        elif not results_url and view_name:
+        elif not view:
             # They searched for an invalid view
             action_result.update_summary({"view_names": views})
             return action_result.set_status(phantom.APP_ERROR, "Specified list view name was not found")
-        elif not results_url and not view_name:
-            # Just return a list of valid views
-            action_result.update_summary({"view_names": views})
-            return action_result.set_status(phantom.APP_SUCCESS, "Listed the valid view names")
 
         # validate limit parameter
         ret_val, limit = self._validate_integers(action_result, param.get("limit", 25), "limit")
@@ -1108,9 +2686,27 @@ class SalesforceConnector(BaseConnector):
         if phantom.is_fail(ret_val):
             return action_result.get_status()
 
-        # Retrieve the list of objects
-        endpoint = results_url
-        ret_val = self._get_listview_results_records(action_result, endpoint, offset, limit)
+        use_keyset_pagination = param.get("use_keyset_pagination", False)
+        after_id = param.get("after_id")
+        if use_keyset_pagination:
+            if offset:
+                return action_result.set_status(phantom.APP_ERROR, "'offset' is not supported with keyset pagination, use 'after_id' instead")
+
+            if after_id and not re.fullmatch(sf_consts.SALESFORCE_OBJECT_ID_REGEX, after_id):
+                return action_result.set_status(phantom.APP_ERROR, "Please provide a valid Salesforce Object ID in the 'after_id' parameter")
+
+        ret_val = self._get_listview_records(action_result, view, offset, limit, use_keyset_pagination, after_id)
+        if phantom.is_fail(ret_val) and from_cache and self._invalidate_listview(action_result, sobject, view_name):
+            # The list view was deleted or recreated since it was cached, look it up again
+            ret_val, view, views, _from_cache = self._get_listview(action_result, sobject, view_name)
+            if phantom.is_fail(ret_val):
+                return ret_val
+            elif not view:
+                action_result.update_summary({"view_names": views})
+                return action_result.set_status(phantom.APP_ERROR, "Specified list view name was not found")
+
+            ret_val = self._get_listview_records(action_result, view, offset, limit, use_keyset_pagination, after_id)
+
         if phantom.is_fail(ret_val):
             return ret_val
 
@@ -1122,6 +2718,13 @@ class SalesforceConnector(BaseConnector):
 
         return action_result.set_status(phantom.APP_SUCCESS, message)
 
+    def _get_listview_records(self, action_result, view, offset, limit, use_keyset_pagination, after_id):
+        if use_keyset_pagination:
+            ret_val, _last_id = self._get_listview_keyset_records(action_result, view, limit, after_id)
+            return ret_val
+
+        return self._get_listview_results_records(action_result, view["resultsUrl"], offset, limit)
+
     def _handle_list_objects(self, param):
         return self._list_objects(param)
 
@@ -1133,9 +2736,14 @@ class SalesforceConnector(BaseConnector):
         sobject = param.get("sobject", "Case")
         obj_id = param["id"]
 
+        ret_val, fields = self._parse_field_names(action_result, param.get("fields"), "fields")
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
         endpoint = sf_consts.API_ENDPOINT_OBJECT_ID.format(version=self._version_uri, sobject=sobject, id=obj_id)
+        params = {"fields": ",".join(fields)} if fields else None
 
-        ret_val, response = self._make_rest_call_helper(endpoint, action_result)
+        ret_val, response = self._make_rest_call_helper(endpoint, action_result, params=params)
         if phantom.is_fail(ret_val):
             return ret_val
 
@@ -1165,129 +2773,592 @@ class SalesforceConnector(BaseConnector):
         if phantom.is_fail(ret_val):
             return ret_val
 
-        return action_result.set_status(phantom.APP_SUCCESS, "Successfully posted to chatter")
+        return action_result.set_status(phantom.APP_SUCCESS, "Successfully posted to chatter")
+
+    def _object_response_to_container(self, response, sobject, cef_name_map=None):
+        cef_name_map = cef_name_map or {}
+        # The streams of a poll may map the fields of the same object differently
+        transformer_key = (sobject, tuple(sorted(cef_name_map.items())))
+        transformer = self._container_transformers.get(transformer_key)
+        if transformer is None:
+            transformer = ContainerTransformer(sobject, cef_name_map, self._last_viewed_date)
+            self._container_transformers[transformer_key] = transformer
+
+        return transformer.transform(response)
+
+    def _batch_response_to_containers(self, response, sobject, cef_name_map=None):
+        containers = []
+
+        self.debug_print("BATCH REQUEST HAS ERRORS: {}".format(response["hasErrors"]))
+
+        results = response["results"]
+        for result in results:
+            if result["statusCode"] != 200:
+                self.debug_print(f"Got bad status code for response: {result}")
+                continue
+
+            # response here matches a single call to get object endpoint
+            response = result["result"]
+            containers.append(self._object_response_to_container(response, sobject, cef_name_map))
+
+        return containers
+
+    def _get_poll_projection(self, sobject, fields, deduplicate):
+        """Complete the fields retrieved for the polled objects with the fields needed to build the containers.
+
+        The additional fields are only added when the object has them, according to its describe.
+
+        Parameters:
+            :param sobject: name of the Salesforce object
+            :param fields: list of fields configured for the poll, all the fields are retrieved when it is empty
+            :param deduplicate: whether the SystemModstamp is needed to deduplicate the objects
+        Returns:
+            :return: list of fields to retrieve
+        """
+        if not fields:
+            return []
+
+        required_fields = ["Id", *sf_consts.SALESFORCE_CONTAINER_FIELDS]
+        if deduplicate:
+            required_fields.append("SystemModstamp")
+
+        ret_val, describe, _from_cache = self._get_describe(ActionResult(), sobject)
+        if phantom.is_fail(ret_val):
+            self.debug_print(f"Unable to get the describe of {sobject}, only adding the Id to the fields to retrieve")
+            required_fields = ["Id"]
+        else:
+            existing_fields = {field["name"] for field in describe.get("fields", [])}
+            required_fields = [x for x in required_fields if x in existing_fields]
+
+        return list(dict.fromkeys([*fields, *required_fields]))
+
+    def _fetch_batch_containers(self, endpoint, batch_ids, sobject, fields=None, cef_name_map=None):
+        """Retrieve one composite batch of objects and convert them to containers.
+
+        Runs in a worker thread, so it uses its own action result instead of the action's one.
+
+        Parameters:
+            :param endpoint: composite batch endpoint
+            :param batch_ids: IDs of the objects included in this batch
+            :param sobject: name of the Salesforce object
+            :param fields: list of fields to retrieve, all the fields are retrieved when it is empty
+            :param cef_name_map: mapping of Salesforce to CEF fields
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, list of containers or the error message
+        """
+        batch_action_result = ActionResult()
+        query_string = "?fields={}".format(",".join(fields)) if fields else ""
+        batch_request = []
+        for obj_id in batch_ids:
+            url = sf_consts.API_ENDPOINT_OBJECT_ID.format(version=self._version_uri, sobject=sobject, id=obj_id)
+            batch_request.append({"method": "GET", "url": f"{url}{query_string}"})
+
+        data = {"batchRequests": batch_request}
+
+        ret_val, response = self._make_rest_call_helper(endpoint, batch_action_result, json=data, method="post")
+        if phantom.is_fail(ret_val):
+            return RetVal(phantom.APP_ERROR, batch_action_result.get_message())
+
+        return RetVal(phantom.APP_SUCCESS, self._batch_response_to_containers(response, sobject, cef_name_map))
+
+    def _create_containers_from_records(self, action_result, ids, sobject, concurrency=1, fields=None, cef_name_map=None):
+        # Number of requests per batch (API only supports 25)
+        num_batch = 25
+        containers = []
+        failed_batches = 0
+
+        endpoint = sf_consts.API_ENDPOINT_BATCH_REQUEST.format(version=self._version_uri)
+
+        # Since we need to individually retrieve each object, we can reduce the total number
+        #  of API calls we need to make by using batch requests (up to 25x less!)
+        batches = [ids[cur_index : cur_index + num_batch] for cur_index in range(0, len(ids), num_batch)]
+
+        # The batches are independent of each other, so they are sent in parallel.
+        # Executor.map returns the results in submission order, which keeps the container order stable.
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = executor.map(lambda batch: self._fetch_batch_containers(endpoint, batch, sobject, fields, cef_name_map), batches)
+
+            for index, (ret_val, result) in enumerate(results):
+                if phantom.is_fail(ret_val):
+                    failed_batches += 1
+                    self.save_progress(f"Error retrieving objects of batch {index + 1}: {result}")
+                    continue
+                containers.extend(result)
+
+        if failed_batches:
+            action_result.update_summary({"failed_batches": failed_batches})
+            if failed_batches == len(batches):
+                return RetVal(action_result.set_status(phantom.APP_ERROR, "Error retrieving objects: all the batch requests failed"))
+
+        return RetVal(phantom.APP_SUCCESS, containers)
+
+    def _get_query_records(self, action_result, query):
+        """Run a SOQL query and return the records of every result page.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param query: SOQL query
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), list of records
+        """
+        endpoint = sf_consts.API_ENDPOINT_RUN_QUERY.format(version=self._version_uri, query_type="query")
+        records = []
+
+        for ret_val, page_records in self._iter_query_pages(action_result, endpoint, {"q": query}):
+            if phantom.is_fail(ret_val):
+                return RetVal(ret_val)
+            records.extend(page_records)
+
+        return RetVal(phantom.APP_SUCCESS, records)
+
+    def _chunk_ids_for_query(self, query_prefix, ids, max_ids):
+        """Split record IDs into IN-lists that keep every query below the URL length limit.
+
+        Parameters:
+            :param query_prefix: query up to and including "IN ("
+            :param ids: list of record IDs
+            :param max_ids: maximum number of IDs in a single query
+        Returns:
+            :return: list of lists of record IDs
+        """
+        chunks = []
+        chunk = []
+        # Every ID is sent quoted, followed by a comma
+        query_length = len(query_prefix) + 1
+        for record_id in ids:
+            id_length = len(record_id) + 3
+            if chunk and (len(chunk) >= max_ids or query_length + id_length > sf_consts.SALESFORCE_MAX_QUERY_LENGTH):
+                chunks.append(chunk)
+                chunk = []
+                query_length = len(query_prefix) + 1
+            chunk.append(record_id)
+            query_length += id_length
+
+        if chunk:
+            chunks.append(chunk)
+
+        return chunks
+
+    def _get_records_by_ids(self, action_result, ids, sobject, fields):
+        """Retrieve objects with SOQL queries filtered on their IDs.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param ids: IDs of the objects to retrieve
+            :param sobject: name of the Salesforce object
+            :param fields: list of fields to retrieve, all the fields are retrieved when it is empty
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), dictionary of the records by ID
+        """
+        if fields:
+            select = ", ".join(fields if "Id" in fields else ["Id", *fields])
+            max_ids = len(ids) or 1
+        else:
+            # FIELDS(ALL) is only accepted by the API together with a LIMIT of at most 200
+            select = "FIELDS(ALL)"
+            max_ids = sf_consts.SALESFORCE_SOQL_MAX_ALL_FIELDS_IDS
+
+        query_prefix = f"SELECT {select} FROM {sobject} WHERE Id IN ("
+
+        objects = {}
+        for chunk in self._chunk_ids_for_query(query_prefix, ids, max_ids):
+            query = "{}{})".format(query_prefix, ",".join(f"'{record_id}'" for record_id in chunk))
+            if not fields:
+                query += f" LIMIT {len(chunk)}"
+
+            ret_val, query_records = self._get_query_records(action_result, query)
+            if phantom.is_fail(ret_val):
+                return RetVal(ret_val)
+
+            for query_record in query_records:
+                objects[query_record["Id"]] = query_record
+
+        return RetVal(phantom.APP_SUCCESS, objects)
+
+    def _create_containers_from_query(self, action_result, ids, sobject, fields, cef_name_map=None):
+        """Retrieve the polled objects with SOQL queries filtered on their IDs and convert them to containers.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param ids: IDs of the objects to retrieve
+            :param sobject: name of the Salesforce object
+            :param fields: list of fields to retrieve, all the fields are retrieved when it is empty
+            :param cef_name_map: mapping of Salesforce to CEF fields
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), list of containers
+        """
+        ret_val, objects = self._get_records_by_ids(action_result, ids, sobject, fields)
+        if phantom.is_fail(ret_val):
+            return RetVal(action_result.set_status(phantom.APP_ERROR, f"Error retrieving objects: {action_result.get_message()}"))
+
+        # Keep the order of the list view, the query returns the records in no particular order
+        containers = [self._object_response_to_container(objects[record_id], sobject, cef_name_map) for record_id in ids if record_id in objects]
+
+        return RetVal(phantom.APP_SUCCESS, containers)
+
+    def _expand_related_objects(self, action_result, containers, expand_fields, cef_name_map=None):
+        """Add an artifact for every object referenced by the lookup fields of the polled objects.
+
+        The referenced objects are retrieved with one SOQL query per object type and chunk of IDs for all the
+        containers. Their object type is found from the key prefix of their ID, which also resolves polymorphic
+        lookups such as OwnerId. The objects are memoized for the whole poll, so an Account referenced by several
+        Cases, even from another stream, is only retrieved once.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param containers: list of containers built from the polled objects
+            :param expand_fields: list of lookup field names to expand
+            :param cef_name_map: mapping of Salesforce to CEF fields used to build the containers
+        Returns:
+            :return: status phantom.APP_SUCCESS, number of artifacts added
+        """
+        cef_name_map = cef_name_map or {}
+        references = []
+        for container in containers:
+            cef = container["artifacts"][0]["cef"]
+            for field in expand_fields:
+                record_id = cef.get(cef_name_map.get(field, field))
+                if isinstance(record_id, str) and re.fullmatch(sf_consts.SALESFORCE_OBJECT_ID_REGEX, record_id):
+                    references.append((container, field, record_id))
+
+        if not references:
+            return RetVal(phantom.APP_SUCCESS, 0)
+
+        ret_val, describe, _from_cache = self._get_describe(action_result)
+        if phantom.is_fail(ret_val):
+            self.debug_print(f"Unable to get the global describe, not expanding the related objects: {action_result.get_message()}")
+            return RetVal(phantom.APP_SUCCESS, 0)
+        sobjects_by_prefix = {x["keyPrefix"]: x["name"] for x in describe.get("sobjects", []) if x.get("keyPrefix")}
+
+        missing_ids = {}
+        with self._related_objects_lock:
+            for _container, _field, record_id in references:
+                related_sobject = sobjects_by_prefix.get(record_id[:3])
+                if related_sobject and record_id not in self._related_objects:
+                    missing_ids.setdefault(related_sobject, {})[record_id] = None
+
+        for related_sobject, ids in missing_ids.items():
+            ret_val, records = self._get_records_by_ids(action_result, list(ids), related_sobject, None)
+            if phantom.is_fail(ret_val):
+                # Some objects cannot be queried, or not by the integration user, the other relationships are still expanded
+                self.debug_print(f"Unable to retrieve the related {related_sobject} objects: {action_result.get_message()}")
+                records = {}
+
+            with self._related_objects_lock:
+                for record_id in ids:
+                    # Objects that could not be retrieved are memoized too, so that they are not requested again
+                    self._related_objects[record_id] = (related_sobject, records.get(record_id))
+
+        num_artifacts = 0
+        for container, field, record_id in references:
+            related_sobject, record = self._related_objects.get(record_id, (None, None))
+            if record is None:
+                continue
+
+            artifact = self._object_response_to_container(record, related_sobject)["artifacts"][0]
+            artifact["name"] = f"{related_sobject} ({field})"
+            container["artifacts"].append(artifact)
+            num_artifacts += 1
+
+        return RetVal(phantom.APP_SUCCESS, num_artifacts)
+
+    def _get_listview_query(self, action_result, sobject, view_name):
+        """Get the SOQL query behind a list view from the list view describe.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param sobject: name of the Salesforce object
+            :param view_name: developer name of the list view
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), SOQL query of the list view
+        """
+        ret_val, view, _views, from_cache = self._get_listview(action_result, sobject, view_name)
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val)
+        if not view:
+            return RetVal(action_result.set_status(phantom.APP_ERROR, "No listview with that specified name was found"))
+
+        ret_val, response = self._make_rest_call_helper(view["describeUrl"], action_result)
+        if phantom.is_fail(ret_val):
+            if from_cache and self._invalidate_listview(action_result, sobject, view_name):
+                # The list view was deleted or recreated since it was cached
+                return self._get_listview_query(action_result, sobject, view_name)
+            return RetVal(ret_val)
+
+        return RetVal(phantom.APP_SUCCESS, response["query"])
+
+    def _listview_query_record_to_columns(self, record, columns):
+        """Convert a record returned by the query of a list view to the format of the list view results."""
+
+        columns_dict = {}
+        for column in columns:
+            path = column["fieldNameOrPath"]
+            value = record
+            for part in path.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            columns_dict[path.replace(".", "_")] = {"value": value}
+
+        return {"columns": columns_dict}
+
+    def _get_listview_keyset_records(self, action_result, view, limit, after_id):
+        """Get the records of a list view by running its query, paging on the record Id instead of an offset.
+
+        Every page starts right after the last Id of the previous page, so its cost does not depend on its position
+        in the view and the whole view can be retrieved.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param view: list view, as returned by the listviews endpoint
+            :param limit: maximum number of records
+            :param after_id: only return the records with an Id greater than this one
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), Id of the last record
+        """
+        ret_val, describe = self._make_rest_call_helper(view["describeUrl"], action_result)
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val)
+
+        columns = describe["columns"]
+        select = list(dict.fromkeys(["Id", *(column["fieldNameOrPath"] for column in columns)]))
+        max_page_size = 2000
+        num_records = 0
+
+        while num_records < limit:
+            page_size = min(max_page_size, limit - num_records)
+            condition = f"Id > '{after_id}'" if after_id else None
+            ret_val, query = self._build_listview_query(
+                action_result, describe["query"], ", ".join(select), condition=condition, order_by="Id ASC", limit=page_size
+            )
+            if phantom.is_fail(ret_val):
+                return RetVal(ret_val)
+
+            ret_val, records = self._get_query_records(action_result, query)
+            if phantom.is_fail(ret_val):
+                return RetVal(ret_val)
+
+            for record in records:
+                action_result.add_data(self._listview_query_record_to_columns(record, columns))
+
+            num_records += len(records)
+            if records:
+                after_id = records[-1]["Id"]
+            if len(records) < page_size:
+                break
+
+        action_result.update_summary({"num_objects": action_result.get_data_size(), "last_id": after_id})
+        return RetVal(phantom.APP_SUCCESS, after_id)
 
-    def _object_response_to_container(self, response, sobject):
-        container = {}
-        artifact = {}
-        cef = {}
-        cef_types = {}
+    def _build_listview_query(self, action_result, view_query, select, condition=None, order_by=None, limit=None):
+        """Rewrite the SOQL query of a list view with another field list, an additional filter and ordering.
 
-        container["artifacts"] = [artifact]
-        artifact["cef"] = cef
-        artifact["cef_types"] = cef_types
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param view_query: SOQL query of the list view
+            :param select: fields to select
+            :param condition: filter combined with the filter of the list view
+            :param order_by: ORDER BY clause replacing the ordering of the list view
+            :param limit: maximum number of records
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), SOQL query
+        """
+        # List view queries have the form SELECT ... FROM <object> [USING SCOPE ...] [WHERE ...] [ORDER BY ...]
+        match = re.match(r"(?is)^\s*SELECT\s+.+?\s+FROM\s+(.+?)(?:\s+ORDER\s+BY\s+.*)?$", view_query)
+        if not match:
+            return RetVal(action_result.set_status(phantom.APP_ERROR, f"Unable to parse the query of the list view: {view_query}"))
 
-        skip_field_names = {"attributes"}
+        source_and_filter = re.split(r"(?i)\s+WHERE\s+", match.group(1), maxsplit=1)
+        source = source_and_filter[0]
 
-        severity_mapping = {
-            "severity 1 (high impact)": "high",
-            "severity 2 (medium impact": "medium",
-            "severity 3 (low impact)": "low",
-            "severity 4 (false positive)": "low",
-        }
+        filters = [f"({x})" for x in (*source_and_filter[1:], condition) if x]
 
-        sensitivity_mapping = {"sensitive": "red", "not sensitive": "white"}
+        query = f"SELECT {select} FROM {source}"
+        if filters:
+            query += " WHERE {}".format(" AND ".join(filters))
+        if order_by:
+            query += f" ORDER BY {order_by}"
+        if limit:
+            query += f" LIMIT {limit}"
 
-        container_name = None
+        return RetVal(phantom.APP_SUCCESS, query)
 
-        for k, v in list(response.items()):
-            if k in skip_field_names:
-                continue
-            name = self._cef_name_map.get(k, k)
-            cef[name] = v
-            if k.endswith("Id") and v is not None:
-                cef_types[name] = ["salesforce object id"]
+    def _poll_for_modified_objects(self, action_result, sobject, view_name, watermark, max_containers):
+        """Get the objects of the list view modified after the watermark, oldest first.
 
-            if name == "Subject":
-                container_name = v
+        Records are ordered on (LastModifiedDate, Id), the Id breaks the ties between records modified in the same
+        second, so that every page continues exactly after the last record ingested by the previous poll.
 
-        if container_name is None:
-            number = response.get("CaseNumber") or response.get("Id", "")
-            container_name = f"Salesforce {sobject} Object # {number}"
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param sobject: name of the Salesforce object
+            :param view_name: developer name of the list view
+            :param watermark: dictionary with the last_modified_date and id of the last ingested record
+            :param max_containers: maximum number of objects to get
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), list of IDs, new watermark
+        """
+        ret_val, view_query = self._get_listview_query(action_result, sobject, view_name)
+        if phantom.is_fail(ret_val):
+            return ret_val, None, None
 
-        container["name"] = container_name
-        artifact["name"] = sobject
+        condition = None
+        if watermark:
+            last_modified_date = watermark["last_modified_date"]
+            condition = "LastModifiedDate > {0} OR (LastModifiedDate = {0} AND Id > '{1}')".format(last_modified_date, watermark["id"])
 
-        try:
-            if not self._last_viewed_date:
-                artifact["cef"].pop("LastViewedDate")
-                artifact["cef"].pop("LastReferencedDate")
-                self.save_progress("Removed LastViewedDate and LastReferencedDate from the artifact.")
-        except:
-            self.debug_print(
-                "LastViewedDate or LastReferencedDate may not be present in the artifact. Unable to remove LastViewedDate from the artifact"
-            )
-            pass
+        ret_val, query = self._build_listview_query(
+            action_result, view_query, "Id, LastModifiedDate", condition=condition, order_by="LastModifiedDate ASC, Id ASC", limit=max_containers
+        )
+        if phantom.is_fail(ret_val):
+            return ret_val, None, None
 
-        try:
-            artifact["source_data_identifier"] = hashlib.sha256(json.dumps(artifact)).hexdigest()
-            container["source_data_identifier"] = hashlib.sha256("{}{}".format(sobject, response["Id"])).hexdigest()
-        except:
-            artifact["source_data_identifier"] = hashlib.sha256(json.dumps(artifact).encode()).hexdigest()
-            container["source_data_identifier"] = hashlib.sha256("{}{}".format(sobject, response["Id"]).encode()).hexdigest()
+        ret_val, records = self._get_query_records(action_result, query)
+        if phantom.is_fail(ret_val):
+            return ret_val, None, None
 
-        severity = response.get("Incident_Severity__c")
-        if severity:
-            container["severity"] = severity_mapping.get(severity.lower(), "medium")
+        if not records:
+            return phantom.APP_SUCCESS, [], watermark
 
-        sensitivity = response.get("Incident_Sensitivity__c")
-        if sensitivity:
-            container["sensitivity"] = sensitivity_mapping.get(sensitivity.lower(), "amber")
+        last_record = records[-1]
+        # SOQL expects datetime literals in UTC without quotes
+        last_modified_date = datetime.strptime(last_record["LastModifiedDate"], sf_consts.SALESFORCE_DATETIME_FORMAT)
+        new_watermark = {
+            "last_modified_date": last_modified_date.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z",
+            "id": last_record["Id"],
+        }
 
-        return container
+        return phantom.APP_SUCCESS, [record["Id"] for record in records], new_watermark
 
-    def _batch_response_to_containers(self, response, sobject):
-        containers = []
+    def _get_change_event_channel(self, sobject):
+        # Custom objects drop the __c suffix in the name of their change event
+        if sobject.endswith("__c"):
+            return f"{sf_consts.SALESFORCE_CHANGE_EVENT_CHANNEL_PREFIX}{sobject[:-3]}__ChangeEvent"
+        return f"{sf_consts.SALESFORCE_CHANGE_EVENT_CHANNEL_PREFIX}{sobject}ChangeEvent"
 
-        self.debug_print("BATCH REQUEST HAS ERRORS: {}".format(response["hasErrors"]))
+    def _cometd_request(self, action_result, session, messages, timeout=sf_consts.SALESFORCE_COMETD_TIMEOUT):
+        """Send Bayeux messages to the CometD endpoint of the Streaming API.
 
-        results = response["results"]
-        for result in results:
-            if result["statusCode"] != 200:
-                self.debug_print(f"Got bad status code for response: {result}")
-                continue
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param session: requests.Session object of the Streaming API session
+            :param messages: list of Bayeux messages
+            :param timeout: number of seconds to wait for the response
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), list of the received messages
+        """
+        # The Bayeux client ID is bound to the cookies set by the handshake, so every stream keeps them in its own session
+        endpoint = sf_consts.API_ENDPOINT_COMETD.format(version=self._version_uri.rsplit("/v", 1)[-1])
+        ret_val, response = self._make_rest_call_helper(endpoint, action_result, method="post", json=messages, session=session, timeout=timeout)
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val)
+
+        for message in response:
+            if message.get("channel", "").startswith("/meta/") and not message.get("successful", True):
+                return RetVal(
+                    action_result.set_status(
+                        phantom.APP_ERROR, f"Error from the Streaming API on {message['channel']}: {message.get('error', 'Unknown error')}"
+                    ),
+                    response,
+                )
 
-            # response here matches a single call to get object endpoint
-            response = result["result"]
-            containers.append(self._object_response_to_container(response, sobject))
+        return RetVal(phantom.APP_SUCCESS, response)
 
-        return containers
+    def _is_handshake_advised(self, response):
+        """Check if the server asks the client to handshake again, the reply to a client ID it does not know."""
+        return any(message.get("advice", {}).get("reconnect") == "handshake" for message in response or [])
 
-    def _create_containers_from_records(self, action_result, records, sobject):
-        num_records = len(records)
-        cur_index = 0
-        # Number of requests per batch (API only supports 25)
-        num_batch = 25
-        containers = []
+    def _subscribe_to_change_events(self, action_result, session, channel, replay_id):
+        """Open a Streaming API session subscribed to the channel from the replay ID.
 
-        endpoint = sf_consts.API_ENDPOINT_BATCH_REQUEST.format(version=self._version_uri)
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), Bayeux client ID
+        """
+        handshake = {"channel": "/meta/handshake", "version": "1.0", "supportedConnectionTypes": ["long-polling"]}
+        ret_val, response = self._cometd_request(action_result, session, [handshake])
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val)
+        client_id = response[0]["clientId"]
+
+        subscribe = {"channel": "/meta/subscribe", "clientId": client_id, "subscription": channel, "ext": {"replay": {channel: replay_id}}}
+        ret_val, response = self._cometd_request(action_result, session, [subscribe])
+        if phantom.is_fail(ret_val) and replay_id >= 0 and "replayId" in action_result.get_message():
+            # The events after the stored replay ID are not retained anymore, start again from the oldest retained event
+            self.save_progress(f"Replay ID {replay_id} is no longer available, replaying all the retained events of {channel}")
+            return self._subscribe_to_change_events(action_result, session, channel, sf_consts.SALESFORCE_REPLAY_ID_ALL_EVENTS)
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val)
 
-        # Since we need to individually retrieve each object, we can reduce the total number
-        #  of API calls we need to make by using batch requests (up to 25x less!)
-        while cur_index < num_records:
-            batch_records = records[cur_index : cur_index + num_batch]
-            batch_request = []
-            for record in batch_records:
-                batch_request.append(
-                    {
-                        "method": "GET",
-                        "url": sf_consts.API_ENDPOINT_OBJECT_ID.format(
-                            version=self._version_uri, sobject=sobject, id=record["fields"]["Id"]["value"]
-                        ),
-                    }
-                )
+        return RetVal(phantom.APP_SUCCESS, client_id)
 
-            data = {"batchRequests": batch_request}
+    def _poll_for_change_events(self, action_result, sobject, channel, replay_id, max_containers, duration):
+        """Listen to the Change Data Capture events of the channel and get the IDs of the created or updated objects.
 
-            ret_val, response = self._make_rest_call_helper(endpoint, action_result, json=data, method="post")
+        Events are read from the replay ID, so that a poll continues exactly after the last event handled by the
+        previous one. Processing stops at max_containers objects, the remaining events are replayed by the next poll.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param sobject: name of the Salesforce object
+            :param channel: name of the change event channel
+            :param replay_id: replay ID of the last handled event, or one of the special -1/-2 values
+            :param max_containers: maximum number of objects to get
+            :param duration: number of seconds to listen for events
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), list of IDs, new replay ID
+        """
+        # Every stream has its own session, the handshake cookies of the other streams would replace its cookies otherwise
+        with self._create_session(1) as session:
+            ret_val, client_id = self._subscribe_to_change_events(action_result, session, channel, replay_id)
             if phantom.is_fail(ret_val):
-                return RetVal(action_result.set_status(phantom.APP_ERROR, f"Error retrieving objects: {action_result.get_message()}"))
+                return ret_val, None, None
 
-            containers.extend(self._batch_response_to_containers(response, sobject))
+            ids = {}
+            handshakes = 0
+            deadline = time.time() + duration
+            while time.time() < deadline and (not max_containers or len(ids) < max_containers):
+                # Salesforce holds a connect request until an event arrives or the advice timeout, so it ends with the poll
+                remaining = deadline - time.time()
+                connect = {
+                    "channel": "/meta/connect",
+                    "clientId": client_id,
+                    "connectionType": "long-polling",
+                    "advice": {"timeout": int(remaining * 1000)},
+                }
+                timeout = min(sf_consts.SALESFORCE_COMETD_TIMEOUT, remaining + sf_consts.SALESFORCE_COMETD_TIMEOUT_MARGIN)
+                ret_val, response = self._cometd_request(action_result, session, [connect], timeout=timeout)
+                if phantom.is_fail(ret_val) and self._is_handshake_advised(response) and handshakes < sf_consts.SALESFORCE_COMETD_MAX_HANDSHAKES:
+                    # The server dropped the client, like after a restart or a long pause, subscribe again after the last handled event
+                    self.debug_print(f"Streaming API client {client_id} is unknown to the server, opening a new session")
+                    handshakes += 1
+                    ret_val, client_id = self._subscribe_to_change_events(action_result, session, channel, replay_id)
+                    if phantom.is_fail(ret_val):
+                        return ret_val, None, None
+                    continue
+                if phantom.is_fail(ret_val):
+                    return ret_val, None, None
+                handshakes = 0
 
-            cur_index += num_batch
+                for message in response:
+                    if message["channel"] != channel:
+                        continue
+                    if max_containers and len(ids) >= max_containers:
+                        break
 
-        return RetVal(phantom.APP_SUCCESS, containers)
+                    header = message["data"]["payload"]["ChangeEventHeader"]
+                    replay_id = message["data"]["event"]["replayId"]
+                    # Events of other objects are streamed by the /data/ChangeEvents channel, deleted objects have nothing to ingest
+                    if header["entityName"] != sobject or header["changeType"] in sf_consts.SALESFORCE_DELETE_CHANGE_TYPES:
+                        continue
+                    if not header.get("recordIds"):
+                        self.debug_print(f"Skipping {header['changeType']} event {replay_id} without record IDs")
+                        continue
+
+                    for record_id in header["recordIds"]:
+                        # Events of bulk changes may hold wildcard IDs that cannot be fetched
+                        if re.fullmatch(sf_consts.SALESFORCE_OBJECT_ID_REGEX, record_id):
+                            ids[record_id] = None
+
+            self._cometd_request(ActionResult(), session, [{"channel": "/meta/disconnect", "clientId": client_id}])
+
+            return phantom.APP_SUCCESS, list(ids), replay_id
 
     def _poll_for_all_objects(self, action_result, endpoint, offset, max_containers):
         MAX_OBJECTS_PER_POLL = 2000
@@ -1319,90 +3390,563 @@ class SalesforceConnector(BaseConnector):
 
         return RetVal(offset, records)
 
-    def _handle_on_poll(self, param):
-        config = self.get_config()
-        action_result = self.add_action_result(ActionResult(dict(param)))
+    def _save_container_artifacts(self, container, artifacts, container_id=None):
+        """Save a container, unless the ID of an existing one is given, and its artifacts.
 
-        sobject = config.get("poll_sobject", "Case")
-        view_name = config.get("poll_view_name")
-        cef_name_map = config.get("cef_name_map")
-        self._last_viewed_date = config.get("last_view_date", False)
-        if cef_name_map:
+        :return: ID of the container, None when it could not be saved
+        """
+        if container_id is None:
+            ret_val, msg, container_id = self.save_container(container)
+            if phantom.is_fail(ret_val):
+                self.save_progress(f"Error saving container: {msg}")
+                return None
+
+        for artifact in artifacts:
+            artifact["container_id"] = container_id
+        ret_val, status_string, _artifact_ids = self.save_artifacts(artifacts)
+        if phantom.is_fail(ret_val):
+            self.save_progress(f"Error saving artifacts: {status_string}")
+            return None
+
+        return container_id
+
+    def _save_changed_artifacts(self, changed, seen_index):
+        """Add the artifacts of changed objects to the containers created when the objects were first ingested.
+
+        :param changed: list of tuples of the container, its artifacts, its SystemModstamp and the existing container ID
+        :return: number of containers updated
+        """
+        artifacts = []
+        for _container, container_artifact, _modstamp, container_id in changed:
+            for artifact in container_artifact:
+                artifact["container_id"] = container_id
+                artifacts.append(artifact)
+
+        ret_val, status_string, _artifact_ids = self.save_artifacts(artifacts) if artifacts else (phantom.APP_SUCCESS, None, None)
+        if phantom.is_fail(ret_val):
+            self.debug_print(f"Error saving the artifacts of the changed objects, saving them one container at a time: {status_string}")
+
+        num_updated = 0
+        for container, container_artifact, modstamp, container_id in changed:
+            if phantom.is_fail(ret_val):
+                new_container_id = self._save_container_artifacts(container, container_artifact, container_id)
+                if new_container_id is None:
+                    # The container may have been deleted since the object was last ingested
+                    new_container_id = self._save_container_artifacts(container, container_artifact)
+                if new_container_id is None:
+                    continue
+                container_id = new_container_id
+
+            num_updated += 1
+            container["container_id"] = container_id
+            if seen_index:
+                seen_index.update(container["source_data_identifier"], modstamp, container_id)
+
+        return num_updated
+
+    def _save_new_containers(self, new_containers, chunk_size, seen_index):
+        """Save new containers, with their artifacts embedded, with a single save_containers call per chunk.
+
+        :param new_containers: list of tuples of the container with its artifacts and its SystemModstamp
+        :return: number of containers that failed to be saved, list of the seconds taken by each chunk
+        """
+        num_failed = 0
+        chunk_seconds = []
+
+        for index in range(0, len(new_containers), chunk_size):
+            chunk = new_containers[index : index + chunk_size]
+            start_time = time.time()
+            ret_val, message, responses = self.save_containers([container for container, _modstamp in chunk])
+            chunk_seconds.append(round(time.time() - start_time, 3))
+
+            if phantom.is_fail(ret_val):
+                num_failed += len(chunk)
+                self.save_progress(f"Error saving containers {index + 1} to {index + len(chunk)}: {message}")
+                continue
+
+            for (container, modstamp), response in zip(chunk, responses or []):
+                container_id = response.get("id")
+                if not response.get("success") or not container_id:
+                    num_failed += 1
+                    self.save_progress("Error saving container {}: {}".format(container.get("name"), response.get("message")))
+                    continue
+
+                container["container_id"] = container_id
+                if seen_index and modstamp:
+                    seen_index.update(container["source_data_identifier"], modstamp, container_id)
+
+        return num_failed, chunk_seconds
+
+    def _save_containers(self, containers, chunk_size, seen_index=None, cef_name_map=None):
+        """Save the polled containers, skipping the objects that did not change since they were last ingested.
+
+        New containers are saved in chunks with their artifacts, the artifacts of changed objects are added to the
+        container created when the object was first ingested.
+
+        Parameters:
+            :param containers: list of containers with their artifacts
+            :param chunk_size: number of containers saved per save_containers call
+            :param seen_index: SeenIndex of the asset, every container is saved as a new container when it is None
+            :param cef_name_map: mapping of Salesforce to CEF fields used to build the containers
+        Returns:
+            :return: dictionary of the numbers of containers saved, failed, skipped and updated
+        """
+        modstamp_name = (cef_name_map or {}).get("SystemModstamp", "SystemModstamp")
+        num_skipped = 0
+        new_containers = []
+        changed = []
+
+        for container in containers:
+            modstamp = container["artifacts"][0]["cef"].get(modstamp_name)
+
+            seen = seen_index.get(container["source_data_identifier"]) if seen_index and modstamp else None
+            if not seen:
+                new_containers.append((container, modstamp))
+            elif seen[0] == modstamp:
+                num_skipped += 1
+            else:
+                changed.append((container, container.pop("artifacts"), modstamp, seen[1]))
+
+        num_failed, chunk_seconds = self._save_new_containers(new_containers, chunk_size, seen_index)
+        num_updated = self._save_changed_artifacts(changed, seen_index)
+
+        summary = {"save_chunk_seconds": chunk_seconds, "num_saved": len(new_containers) - num_failed, "num_failed": num_failed}
+        if seen_index:
+            summary.update({"num_skipped": num_skipped, "num_updated": num_updated})
+        return summary
+
+    def _save_polled_files(self, containers, record_ids, concurrency, byte_limiter):
+        """Save the files of the polled objects to the vault of their containers.
+
+        Only the containers saved or updated by this poll have a container_id, unchanged objects are not checked again.
+        A failure is logged without failing the poll, the files are retried when the object changes.
+
+        :return: number of files added to the vault
+        """
+        num_saved = 0
+        for container, record_id in zip(containers, record_ids):
+            container_id = container.get("container_id")
+            if not container_id or not record_id:
+                continue
+
+            files_action_result = ActionResult()
+            ret_val, files = self._save_record_files(files_action_result, record_id, container_id, concurrency, byte_limiter)
+            if phantom.is_fail(ret_val):
+                self.debug_print(f"Unable to save the files of {record_id}: {files_action_result.get_message()}")
+                continue
+
+            for file_details in files:
+                if file_details.get("error"):
+                    self.debug_print("Unable to save the file {} of {}: {}".format(file_details["name"], record_id, file_details["error"]))
+            num_saved += len([x for x in files if x.get("vault_id")])
+
+        return num_saved
+
+    def _parse_cef_name_map(self, action_result, cef_name_map, key):
+        """Parse and validate a mapping of Salesforce to CEF fields.
+
+        Parameters:
+            :param action_result: object of ActionResult class
+            :param cef_name_map: JSON string or dictionary of the mapping
+            :param key: name of the parameter, used in the error messages
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), mapping dictionary
+        """
+        if not cef_name_map:
+            return RetVal(phantom.APP_SUCCESS, {})
+
+        if isinstance(cef_name_map, str):
             try:
-                self._cef_name_map = json.loads(cef_name_map)
+                cef_name_map = json.loads(cef_name_map)
             except Exception as e:
                 error_message = self._get_error_message_from_exception(e)
-                return action_result.set_status(phantom.APP_ERROR, f"Error parsing cef_name_map {error_message}")
+                return RetVal(action_result.set_status(phantom.APP_ERROR, f"Error parsing {key} {error_message}"))
 
-            # Validate JSON file
-            for k, v in self._cef_name_map.items():
-                if not isinstance(v, str):
-                    msg = f"{k} key's value is not string in JSON file which contains mapping of Salesforce to CEF fields"
-                    return action_result.set_status(phantom.APP_ERROR, msg)
+        if not isinstance(cef_name_map, dict):
+            return RetVal(action_result.set_status(phantom.APP_ERROR, f"Please provide a JSON object in the '{key}' parameter"))
 
-                if v.strip() == "" or k.strip() == "":
-                    msg = "Please add non-empty key or value in JSON file which contains mapping of Salesforce to CEF fields"
-                    return action_result.set_status(phantom.APP_ERROR, msg)
-        else:
-            self._cef_name_map = {}
+        # Validate JSON file
+        for k, v in cef_name_map.items():
+            if not isinstance(v, str):
+                msg = f"{k} key's value is not string in JSON file which contains mapping of Salesforce to CEF fields"
+                return RetVal(action_result.set_status(phantom.APP_ERROR, msg))
 
-        max_containers = None
+            if v.strip() == "" or k.strip() == "":
+                msg = "Please add non-empty key or value in JSON file which contains mapping of Salesforce to CEF fields"
+                return RetVal(action_result.set_status(phantom.APP_ERROR, msg))
+
+        return RetVal(phantom.APP_SUCCESS, cef_name_map)
+
+    def _get_poll_streams(self, action_result, config):
+        """Get the (sobject, view, cef_name_map) streams ingested by the poll.
+
+        Without the poll_streams setting, the poll ingests the single stream of the poll_sobject, poll_view_name and
+        cef_name_map settings. Its name is None, its cursor is kept at the top level of the state as it always was.
+
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS(along with appropriate message), list of stream dictionaries
+        """
+        poll_streams = config.get("poll_streams")
+        if not poll_streams:
+            ret_val, cef_name_map = self._parse_cef_name_map(action_result, config.get("cef_name_map"), "cef_name_map")
+            if phantom.is_fail(ret_val):
+                return RetVal(ret_val)
+
+            stream = {
+                "name": None,
+                "sobject": config.get("poll_sobject", "Case"),
+                "view_name": config.get("poll_view_name"),
+                "cef_name_map": cef_name_map,
+                "change_event_channel": config.get("poll_change_event_channel"),
+                "expand_fields": None,
+            }
+            return RetVal(phantom.APP_SUCCESS, [stream])
+
+        try:
+            entries = json.loads(poll_streams)
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            return RetVal(action_result.set_status(phantom.APP_ERROR, f"Error parsing poll_streams {error_message}"))
+
+        if not isinstance(entries, list) or not entries:
+            return RetVal(action_result.set_status(phantom.APP_ERROR, "Please provide a non-empty JSON list in the 'poll_streams' parameter"))
+
+        streams = []
+        for entry in entries:
+            if not isinstance(entry, dict) or not entry.get("sobject"):
+                return RetVal(
+                    action_result.set_status(
+                        phantom.APP_ERROR, "Every entry of the 'poll_streams' parameter must be a JSON object with an sobject"
+                    )
+                )
+
+            ret_val, cef_name_map = self._parse_cef_name_map(action_result, entry.get("cef_name_map"), "cef_name_map of poll_streams")
+            if phantom.is_fail(ret_val):
+                return RetVal(ret_val)
+
+            expand_fields = entry.get("expand_fields")
+            if expand_fields is not None:
+                ret_val, expand_fields = self._parse_field_names(action_result, expand_fields, "expand_fields of poll_streams")
+                if phantom.is_fail(ret_val):
+                    return RetVal(ret_val)
+
+            view_name = entry.get("view_name")
+            name = f"{entry['sobject']}/{view_name}" if view_name else entry["sobject"]
+            if any(stream["name"] == name for stream in streams):
+                return RetVal(action_result.set_status(phantom.APP_ERROR, f"The {name} stream is listed twice in the 'poll_streams' parameter"))
+
+            streams.append(
+                {
+                    "name": name,
+                    "sobject": entry["sobject"],
+                    "view_name": view_name,
+                    "cef_name_map": cef_name_map,
+                    "change_event_channel": entry.get("change_event_channel"),
+                    "expand_fields": expand_fields,
+                }
+            )
+
+        return RetVal(phantom.APP_SUCCESS, streams)
+
+    def _get_stream_cursor(self, stream):
+        """Get the state dictionary holding the cursor of the stream, the cursors of named streams are kept apart."""
+        if stream["name"] is None:
+            return self._state
+        return self._state.setdefault("poll_streams", {}).setdefault(stream["name"], {})
+
+    def _poll_stream(self, stream, settings):
+        """Get the containers of the objects of a stream that are new or changed since its cursor.
 
-        if view_name is None:
-            return action_result.set_status(phantom.APP_ERROR, "Error: Must specify poll_view_name")
+        Runs in a worker thread, so it uses its own action result instead of the action's one.
 
+        Parameters:
+            :param stream: stream dictionary, with a copy of its cursor
+            :param settings: dictionary of the poll settings shared by the streams
+        Returns:
+            :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, list of containers or the error message, new cursor values
+            (None when a batch request failed, the containers of the other batches are still returned)
+        """
+        action_result = ActionResult()
+        sobject = stream["sobject"]
+        view_name = stream["view_name"]
+        cursor = stream["cursor"]
+        cursor_mode = settings["cursor_mode"]
+
+        # Change events are streamed for the whole object, the other cursor modes read the list view
+        if view_name is None and cursor_mode != sf_consts.SALESFORCE_CURSOR_MODE_CHANGE_EVENTS:
+            return phantom.APP_ERROR, "Error: Must specify poll_view_name", None
+
+        if settings["ingestion_mode"] == sf_consts.SALESFORCE_INGESTION_MODE_SOQL and not re.fullmatch(
+            sf_consts.SALESFORCE_FIELD_NAME_REGEX, sobject
+        ):
+            return phantom.APP_ERROR, "Please provide a valid object name in the 'poll_sobject' parameter", None
+
+        change_event_channel = None
+        if cursor_mode == sf_consts.SALESFORCE_CURSOR_MODE_CHANGE_EVENTS:
+            change_event_channel = stream["change_event_channel"] or self._get_change_event_channel(sobject)
+            if not change_event_channel.startswith(sf_consts.SALESFORCE_CHANGE_EVENT_CHANNEL_PREFIX):
+                return phantom.APP_ERROR, "Please provide a Change Data Capture channel in the 'poll_change_event_channel' parameter", None
+
+        # The replay IDs are kept per channel, changing the channel starts again from the new events
+        replay_id = cursor.get("poll_replay_ids", {}).get(change_event_channel)
+
+        max_containers = None
+        watermark = None
         if self.is_poll_now():
             cur_offset = 0
-            # validate container_count parameter
-            ret_val, max_containers = self._validate_integers(action_result, param.get("container_count", 10), "container_count")
-            if phantom.is_fail(ret_val):
-                return action_result.get_status()
+            max_containers = settings["container_count"]
         else:
             # validate cur_offset parameter
-            ret_val, cur_offset = self._validate_integers(action_result, self._state.get("cur_offset", 0), "cur_offset", allow_zero=True)
+            ret_val, cur_offset = self._validate_integers(action_result, cursor.get("cur_offset", 0), "cur_offset", allow_zero=True)
             if phantom.is_fail(ret_val):
-                return action_result.get_status()
+                return phantom.APP_ERROR, action_result.get_message(), None
 
-            # validate first_ingestion_max parameter
-            if not cur_offset:
-                ret_val, max_containers = self._validate_integers(action_result, config.get("first_ingestion_max", 10), "first_ingestion_max")
-                if phantom.is_fail(ret_val):
-                    return action_result.get_status()
+            watermark = cursor.get("poll_watermark")
+            if cursor_mode == sf_consts.SALESFORCE_CURSOR_MODE_WATERMARK:
+                first_ingestion = not watermark
+            elif cursor_mode == sf_consts.SALESFORCE_CURSOR_MODE_CHANGE_EVENTS:
+                first_ingestion = replay_id is None
+            else:
+                first_ingestion = not cur_offset
+
+            if first_ingestion:
+                max_containers = settings["first_ingestion_max"]
+
+        if cursor_mode == sf_consts.SALESFORCE_CURSOR_MODE_CHANGE_EVENTS:
+            self.save_progress(f"Listening to {change_event_channel} for {settings['stream_seconds']} seconds using {self._version_uri} version")
+        else:
+            self.save_progress(f"Getting view {view_name} from {sobject} object using {self._version_uri} version")
+
+        new_cursor = {}
+        if cursor_mode == sf_consts.SALESFORCE_CURSOR_MODE_CHANGE_EVENTS:
+            # The first ingestion replays the retained events, as the list view cursors start from the existing objects
+            if replay_id is None:
+                replay_id = sf_consts.SALESFORCE_REPLAY_ID_ALL_EVENTS
+            ret_val, ids, new_replay_id = self._poll_for_change_events(
+                action_result, sobject, change_event_channel, replay_id, max_containers, settings["stream_seconds"]
+            )
+            if phantom.is_fail(ret_val):
+                return phantom.APP_ERROR, action_result.get_message(), None
+            new_cursor["poll_replay_ids"] = {**cursor.get("poll_replay_ids", {}), change_event_channel: new_replay_id}
+        elif cursor_mode == sf_consts.SALESFORCE_CURSOR_MODE_WATERMARK:
+            ret_val, ids, new_watermark = self._poll_for_modified_objects(action_result, sobject, view_name, watermark, max_containers)
+            if phantom.is_fail(ret_val):
+                return phantom.APP_ERROR, action_result.get_message(), None
+            new_cursor["poll_watermark"] = new_watermark
+        else:
+            list_view_from_obj_url = sf_consts.API_ENDPOINT_GET_LISTVIEWS_FROM_OBJECT.format(
+                version=self._version_uri, sobject=sobject, view_name=view_name
+            )
+
+            new_offset, records = self._poll_for_all_objects(action_result, list_view_from_obj_url, cur_offset, max_containers)
+
+            if "The requested resource does not exist" in action_result.get_message():
+                return phantom.APP_ERROR, "No listview with that specified name was found", None
+
+            if new_offset is None:
+                return phantom.APP_ERROR, action_result.get_message(), None
+
+            ids = [record["fields"]["Id"]["value"] for record in records]
+            new_cursor["cur_offset"] = new_offset
+
+        expand_fields = settings["expand_fields"] if stream["expand_fields"] is None else stream["expand_fields"]
+        poll_fields = settings["poll_fields"]
+        if not poll_fields and settings["fields_from_cef_name_map"]:
+            poll_fields = list(stream["cef_name_map"])
+        if poll_fields:
+            # The lookup fields are needed to find the related objects
+            poll_fields = list(dict.fromkeys([*poll_fields, *expand_fields]))
+        poll_fields = self._get_poll_projection(sobject, poll_fields, settings["deduplicate"])
+
+        if settings["ingestion_mode"] == sf_consts.SALESFORCE_INGESTION_MODE_SOQL:
+            ret_val, containers = self._create_containers_from_query(action_result, ids, sobject, poll_fields, stream["cef_name_map"])
+        else:
+            ret_val, containers = self._create_containers_from_records(
+                action_result, ids, sobject, settings["concurrency"], poll_fields, stream["cef_name_map"]
+            )
+        if phantom.is_fail(ret_val):
+            return phantom.APP_ERROR, action_result.get_message(), None
+
+        if expand_fields:
+            _ret_val, stream["summary"]["num_related_artifacts"] = self._expand_related_objects(
+                action_result, containers, expand_fields, stream["cef_name_map"]
+            )
+
+        stream["summary"].update(action_result.get_summary())
+        stream["summary"]["num_objects"] = len(ids)
+        if stream["summary"].get("failed_batches"):
+            # The cursor is not advanced, so that the next poll retries the objects of the failed batches
+            stream["summary"]["error"] = f"Error retrieving the objects of {stream['summary']['failed_batches']} batch requests"
+            return phantom.APP_ERROR, containers, None
+        return phantom.APP_SUCCESS, containers, new_cursor
+
+    def _handle_on_poll(self, param):
+        config = self.get_config()
+        action_result = self.add_action_result(ActionResult(dict(param)))
+
+        self._last_viewed_date = config.get("last_view_date", False)
+        ret_val, streams = self._get_poll_streams(action_result, config)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        # The transformers depend on the cef_name_map, they are compiled again on every poll
+        self._container_transformers = {}
+        # The related objects are retrieved again on every poll, to ingest their current values
+        self._related_objects = {}
 
-        self.save_progress(f"Getting view {view_name} from {sobject} object using {self._version_uri} version")
+        # validate batch_concurrency parameter
+        ret_val, concurrency = self._validate_integers(
+            action_result, config.get("batch_concurrency", sf_consts.SALESFORCE_DEFAULT_BATCH_CONCURRENCY), "batch_concurrency"
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
 
-        list_view_from_obj_url = sf_consts.API_ENDPOINT_GET_LISTVIEWS_FROM_OBJECT.format(
-            version=self._version_uri, sobject=sobject, view_name=view_name
+        # validate poll_min_api_budget parameter
+        ret_val, min_api_budget = self._validate_integers(
+            action_result,
+            config.get("poll_min_api_budget", sf_consts.SALESFORCE_DEFAULT_POLL_MIN_API_BUDGET),
+            "poll_min_api_budget",
+            allow_zero=True,
         )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
 
-        new_offset, records = self._poll_for_all_objects(action_result, list_view_from_obj_url, cur_offset, max_containers)
+        # Polling is the lowest priority work of the asset, it yields the remaining daily API requests to the other actions
+        api_budget = self._get_api_budget()
+        if api_budget is not None and not self.is_poll_now():
+            if api_budget * 100 < min_api_budget:
+                message = f"Skipped polling, only {api_budget:.1%} of the daily API requests of the organization are left"
+                self.save_progress(message)
+                return action_result.set_status(phantom.APP_SUCCESS, message)
+
+            if api_budget < sf_consts.SALESFORCE_API_BUDGET_SLOWDOWN:
+                self.save_progress(f"Only {api_budget:.1%} of the daily API requests are left, slowing down polling")
+                self._rate_limiter.set_rate(sf_consts.SALESFORCE_LOW_BUDGET_REQUESTS_PER_SECOND)
+
+        ingestion_mode = config.get("poll_ingestion_mode", sf_consts.SALESFORCE_INGESTION_MODE_BATCH)
+        if ingestion_mode not in sf_consts.SALESFORCE_INGESTION_MODES:
+            return action_result.set_status(
+                phantom.APP_ERROR, f"Please provide a valid value in the 'poll_ingestion_mode' parameter: {sf_consts.SALESFORCE_INGESTION_MODES}"
+            )
 
-        if "The requested resource does not exist" in action_result.get_message():
-            return action_result.set_status(phantom.APP_ERROR, "No listview with that specified name was found")
+        ret_val, poll_fields = self._parse_field_names(action_result, config.get("poll_fields"), "poll_fields")
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
 
-        if new_offset is None:
+        ret_val, expand_fields = self._parse_field_names(action_result, config.get("poll_expand_fields"), "poll_expand_fields")
+        if phantom.is_fail(ret_val):
             return action_result.get_status()
 
-        ret_val, containers = self._create_containers_from_records(action_result, records, sobject)
+        # validate poll_save_chunk_size parameter
+        ret_val, save_chunk_size = self._validate_integers(
+            action_result, config.get("poll_save_chunk_size", sf_consts.SALESFORCE_DEFAULT_SAVE_CHUNK_SIZE), "poll_save_chunk_size"
+        )
         if phantom.is_fail(ret_val):
-            return ret_val
+            return action_result.get_status()
 
-        self.save_progress("Saving containers")
+        cursor_mode = config.get("poll_cursor_mode", sf_consts.SALESFORCE_CURSOR_MODE_OFFSET)
+        if cursor_mode not in sf_consts.SALESFORCE_CURSOR_MODES:
+            return action_result.set_status(
+                phantom.APP_ERROR, f"Please provide a valid value in the 'poll_cursor_mode' parameter: {sf_consts.SALESFORCE_CURSOR_MODES}"
+            )
 
-        for container in containers:
-            container_artifact = container.pop("artifacts")
-            ret_val, msg, container_id = self.save_container(container)
+        settings = {
+            "concurrency": concurrency,
+            "ingestion_mode": ingestion_mode,
+            "cursor_mode": cursor_mode,
+            "poll_fields": poll_fields,
+            "expand_fields": expand_fields,
+            "fields_from_cef_name_map": config.get("poll_fields_from_cef_name_map", False),
+            "deduplicate": config.get("poll_deduplicate", True),
+        }
+
+        if cursor_mode == sf_consts.SALESFORCE_CURSOR_MODE_CHANGE_EVENTS:
+            # validate poll_stream_seconds parameter
+            ret_val, settings["stream_seconds"] = self._validate_integers(
+                action_result, config.get("poll_stream_seconds", sf_consts.SALESFORCE_DEFAULT_STREAM_SECONDS), "poll_stream_seconds"
+            )
             if phantom.is_fail(ret_val):
-                self.save_progress(f"Error saving container: {msg}")
+                return action_result.get_status()
 
-            for artifact in container_artifact:
-                artifact["container_id"] = container_id
-            ret_val, status_string, _artifact_ids = self.save_artifacts(container_artifact)
+        if self.is_poll_now():
+            # validate container_count parameter
+            ret_val, settings["container_count"] = self._validate_integers(action_result, param.get("container_count", 10), "container_count")
+        else:
+            # validate first_ingestion_max parameter
+            ret_val, settings["first_ingestion_max"] = self._validate_integers(
+                action_result, config.get("first_ingestion_max", 10), "first_ingestion_max"
+            )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        poll_attachments = config.get("poll_attachments", False)
+        if poll_attachments:
+            ret_val, download_concurrency, byte_limiter = self._get_download_settings(action_result)
             if phantom.is_fail(ret_val):
-                self.save_progress(f"Error saving artifacts: {status_string}")
+                return action_result.get_status()
+
+        # The workers read a copy of the cursors, the state is only read and written from this thread
+        for stream in streams:
+            stream["cursor"] = copy.deepcopy(self._get_stream_cursor(stream))
+            stream["summary"] = {}
 
-        if not self.is_poll_now():
-            self._state["cur_offset"] = new_offset
+        def poll_stream(stream):
+            start_time = time.time()
+            result = self._poll_stream(stream, settings)
+            stream["summary"]["fetch_seconds"] = round(time.time() - start_time, 3)
+            return result
+
+        # The streams share the session, the OAuth token and the rate limit of the asset
+        with ThreadPoolExecutor(max_workers=len(streams)) as executor:
+            results = list(executor.map(poll_stream, streams))
+
+        seen_index = None
+        if settings["deduplicate"] and not self.is_poll_now():
+            try:
+                seen_index = SeenIndex(os.path.join(self.get_state_dir(), f"{self.get_asset_id()}_seen_index.db"))
+            except Exception as e:
+                error_message = self._get_error_message_from_exception(e)
+                self.debug_print(f"Unable to open the index of the ingested objects, saving every container. {error_message}")
+
+        failed_streams = []
+        try:
+            # Containers are saved from this thread only, the platform calls and the index are not shared across threads
+            for stream, (ret_val, containers, new_cursor) in zip(streams, results):
+                if phantom.is_fail(ret_val):
+                    failed_streams.append(stream)
+                    if not isinstance(containers, list):
+                        stream["summary"]["error"] = containers
+                        continue
+
+                self.save_progress(f"Saving containers of {stream['name'] or stream['sobject']}")
+                id_name = stream["cef_name_map"].get("Id", "Id")
+                record_ids = [container["artifacts"][0]["cef"].get(id_name) for container in containers]
+                start_time = time.time()
+                stream["summary"].update(self._save_containers(containers, save_chunk_size, seen_index, stream["cef_name_map"]))
+                stream["summary"]["save_seconds"] = round(time.time() - start_time, 3)
+
+                if poll_attachments:
+                    stream["summary"]["num_files_saved"] = self._save_polled_files(containers, record_ids, download_concurrency, byte_limiter)
+
+                if new_cursor is not None and not self.is_poll_now():
+                    self._get_stream_cursor(stream).update(new_cursor)
+        finally:
+            if seen_index:
+                seen_index.close()
+
+        if len(streams) == 1:
+            action_result.update_summary({key: value for key, value in streams[0]["summary"].items() if key != "error"})
+            if failed_streams:
+                return action_result.set_status(phantom.APP_ERROR, streams[0]["summary"]["error"])
+        else:
+            totals = {}
+            for stream in streams:
+                for key in ("num_objects", "num_related_artifacts", "num_saved", "num_failed", "num_skipped", "num_updated", "num_files_saved"):
+                    if key in stream["summary"]:
+                        totals[key] = totals.get(key, 0) + stream["summary"][key]
+            action_result.update_summary({**totals, "streams": {stream["name"]: stream["summary"] for stream in streams}})
+            if failed_streams:
+                names = ", ".join(stream["name"] for stream in failed_streams)
+                return action_result.set_status(phantom.APP_ERROR, f"Error polling the {names} streams, the other streams were ingested")
 
         return action_result.set_status(phantom.APP_SUCCESS, "Successfully ingested containers")
 
@@ -1414,12 +3958,21 @@ class SalesforceConnector(BaseConnector):
 
         self.debug_print("action_id", self.get_action_identifier())
 
+        if action_id != "test_connectivity":
+            action_result = ActionResult(dict(param))
+            if phantom.is_fail(self._resolve_api_version(action_result)):
+                self.add_action_result(action_result)
+                return action_result.get_status()
+
         if action_id == "test_connectivity":
             ret_val = self._handle_test_connectivity(param)
 
         elif action_id == "run_query":
             ret_val = self._handle_run_query(param)
 
+        elif action_id == "run_bulk_query":
+            ret_val = self._handle_run_bulk_query(param)
+
         elif action_id == "create_object":
             ret_val = self._handle_create_object(param)
 
@@ -1444,6 +3997,24 @@ class SalesforceConnector(BaseConnector):
         elif action_id == "get_ticket":
             ret_val = self._handle_get_ticket(param)
 
+        elif action_id == "bulk_create_objects":
+            ret_val = self._handle_bulk_create_objects(param)
+
+        elif action_id == "bulk_update_objects":
+            ret_val = self._handle_bulk_update_objects(param)
+
+        elif action_id == "bulk_delete_objects":
+            ret_val = self._handle_bulk_delete_objects(param)
+
+        elif action_id == "run_composite":
+            ret_val = self._handle_run_composite(param)
+
+        elif action_id == "describe_object":
+            ret_val = self._handle_describe_object(param)
+
+        elif action_id == "get_attachments":
+            ret_val = self._handle_get_attachments(param)
+
         elif action_id == "list_objects":
             ret_val = self._handle_list_objects(param)
 
@@ -1456,12 +4027,16 @@ class SalesforceConnector(BaseConnector):
         elif action_id == "on_poll":
             ret_val = self._handle_on_poll(param)
 
+        for action_result in self.get_action_results():
+            action_result.update_summary({"api_usage": dict(self._api_counters)})
+
         return ret_val
 
     def initialize(self):
         # Load the state in initialize, use it to store data
         # that needs to be accessed across actions
-        self._state = self.load_state()
+        self._state = self._load_state()
+        self._loaded_state = copy.deepcopy(self._state)
         config = self.get_config()
 
         self._username = config.get("username")
@@ -1474,16 +4049,91 @@ class SalesforceConnector(BaseConnector):
                 return self.set_status(phantom.APP_ERROR, "Password must be specified with a username")
             self._auth_flow = self.USERNAME_PASSWORD
 
+        # validate connection_pool_size parameter
+        ret_val, pool_size = self._validate_integers(
+            self, config.get("connection_pool_size", sf_consts.SALESFORCE_DEFAULT_POOL_SIZE), "connection_pool_size"
+        )
+        if phantom.is_fail(ret_val):
+            return self.get_status()
+        self._session = self._create_session(pool_size)
+
+        # validate max_requests_per_second parameter
+        ret_val, max_rate = self._validate_integers(
+            self,
+            config.get("max_requests_per_second", sf_consts.SALESFORCE_DEFAULT_MAX_REQUESTS_PER_SECOND),
+            "max_requests_per_second",
+            allow_zero=True,
+        )
+        if phantom.is_fail(ret_val):
+            return self.get_status()
+        # Every action run of the asset draws from the same bucket, so that the limit holds for the asset as a whole
+        rate_limit_path = os.path.join(self.get_state_dir(), f"{self.get_asset_id()}_rate_limit.json")
+        self._rate_limiter = SharedTokenBucket(rate_limit_path, max_rate, max(1, max_rate))
+
         if self.get_action_identifier() != "test_connectivity":
-            try:
-                self._version_uri = self._state["latest_version"]
-            except KeyError:
-                return self.set_status(phantom.APP_ERROR, "Unable to retrieve API version. Has test connectivity been ran?")
+            self._load_oauth_token_from_state()
         return phantom.APP_SUCCESS
 
+    def _get_state_file_path(self):
+        return os.path.join(self.get_state_dir(), f"{self.get_asset_id()}_state.json")
+
+    def _load_state(self):
+        """Load the state of the asset, under the lock held by the actions saving it."""
+        with _locked(f"{self._get_state_file_path()}.lock"):
+            return self.load_state() or {}
+
+    def _save_state(self, keys=None):
+        """Save the state, merged with the state saved meanwhile by the other actions running on the asset.
+
+        Every key is updated with compare and swap: a key changed by this action is only written when the saved
+        value is still the one loaded by this action, otherwise the value saved by the other action is kept. This
+        way an action finishing late does not overwrite a rotated refresh token, a newer token or poll cursor.
+
+        Parameters:
+            :param keys: keys to save in the middle of an action, only these keys of the state are updated in place.
+            The whole state is saved and reloaded when not given, which is only done when the action finishes.
+        """
+        state_file_path = self._get_state_file_path()
+        with _locked(f"{state_file_path}.lock"):
+            saved_state = self.load_state() or {}
+            for key in keys or set(self._state) | set(self._loaded_state):
+                value = self._state.get(key, _MISSING)
+                loaded_value = self._loaded_state.get(key, _MISSING)
+                if value == loaded_value:
+                    continue
+
+                if saved_state.get(key, _MISSING) != loaded_value:
+                    self.debug_print(f"State key {key} was saved by another action, keeping its value")
+                    continue
+
+                if value is _MISSING:
+                    saved_state.pop(key, None)
+                else:
+                    saved_state[key] = value
+
+            _write_json_atomically(state_file_path, saved_state)
+
+        if keys:
+            # The other keys may be in use by the poll workers, so the state dictionary is not replaced
+            for key in keys:
+                if key in saved_state:
+                    self._state[key] = saved_state[key]
+                    self._loaded_state[key] = copy.deepcopy(saved_state[key])
+                else:
+                    self._state.pop(key, None)
+                    self._loaded_state.pop(key, None)
+            return
+
+        self._loaded_state = copy.deepcopy(saved_state)
+        self._state.clear()
+        self._state.update(saved_state)
+
     def finalize(self):
         # Save the state, this data is saved across actions and app upgrades
-        self.save_state(self._state)
+        self._save_state()
+        if self._session:
+            self._session.close()
+            self._session = None
         return phantom.APP_SUCCESS
 
 
@@ -27,6 +27,7 @@ URL_GET_TOKEN_TEST = f"https://test.salesforce.com{SALESFORCE_OAUTH_TOKEN_PATH}"
 
 
 API_ENDPOINT_DESCRIBE_GLOBAL = "{version}/sobjects/"
+API_ENDPOINT_DESCRIBE_OBJECT = "{version}/sobjects/{sobject}/describe/"
 API_ENDPOINT_GET_UPDATED = "{version}/sobjects/{sobject}/updated/"
 API_ENDPOINT_OBJECT_ID = "{version}/sobjects/{sobject}/{id}/"
 API_ENDPOINT_RUN_QUERY = "{version}/{query_type}/"
@@ -34,6 +35,16 @@ API_ENDPOINT_OBJECT = "{version}/sobjects/{sobject}/"
 API_ENDPOINT_GET_LISTVIEWS = "{version}/sobjects/{sobject}/listviews/"
 API_ENDPOINT_GET_LISTVIEW_LOCATOR = "{version}/sobjects/{sobject}/listviews/{locator}/"
 API_ENDPOINT_BATCH_REQUEST = "{version}/composite/batch/"
+API_ENDPOINT_BULK_QUERY_JOBS = "{version}/jobs/query"
+API_ENDPOINT_BULK_QUERY_JOB = "{version}/jobs/query/{job_id}/"
+API_ENDPOINT_BULK_INGEST_JOBS = "{version}/jobs/ingest"
+API_ENDPOINT_BULK_INGEST_JOB = "{version}/jobs/ingest/{job_id}/"
+API_ENDPOINT_COLLECTIONS = "{version}/composite/sobjects"
+API_ENDPOINT_COMPOSITE = "{version}/composite"
+API_ENDPOINT_COMPOSITE_GRAPH = "{version}/composite/graph"
+API_ENDPOINT_CONTENT_VERSION_DATA = "{version}/sobjects/ContentVersion/{id}/VersionData"
+API_ENDPOINT_ATTACHMENT_BODY = "{version}/sobjects/Attachment/{id}/Body"
+API_ENDPOINT_COMETD = "/cometd/{version}"
 API_ENDPOINT_GET_LISTVIEWS_FROM_OBJECT = "{version}/ui-api/list-records/{sobject}/{view_name}"
 
 CASE_FIELD_MAP = {
@@ -45,10 +56,89 @@ CASE_FIELD_MAP = {
     "closed": "IsClosed",
     "escalated": "IsEscalated",
 }
+# Fields used to build the containers, always retrieved when the polled fields are restricted
+SALESFORCE_CONTAINER_FIELDS = ["Subject", "CaseNumber", "Incident_Severity__c", "Incident_Sensitivity__c"]
+SALESFORCE_SEVERITY_MAPPING = {
+    "severity 1 (high impact)": "high",
+    "severity 2 (medium impact": "medium",
+    "severity 3 (low impact)": "low",
+    "severity 4 (false positive)": "low",
+}
+SALESFORCE_SENSITIVITY_MAPPING = {"sensitive": "red", "not sensitive": "white"}
 SALESFORCE_INVALID_INTEGER = 'Please provide non-zero positive integer in "{parameter}"'
 SALESFORCE_UNKNOWN_ERR_MSG = "Unknown error occurred. Please check the asset configuration and|or action parameters."
 SALESFORCE_ERR_CODE_UNAVAILABLE = "Error code unavailable"
 SALESFORCE_DEFAULT_TIMEOUT = 30
+SALESFORCE_OAUTH_WAIT_TIMEOUT = 300
+SALESFORCE_OAUTH_MIN_CHECK_INTERVAL = 1
+SALESFORCE_OAUTH_MAX_CHECK_INTERVAL = 5
+# Length of the response body kept in the debug data of a failed request
+SALESFORCE_DEBUG_TEXT_MAX_LENGTH = 4096
+SALESFORCE_DEFAULT_POOL_SIZE = 10
+SALESFORCE_CONNECT_RETRIES = 3
+SALESFORCE_RETRY_BACKOFF_FACTOR = 0.5
+SALESFORCE_DEFAULT_BATCH_CONCURRENCY = 4
+SALESFORCE_DEFAULT_DOWNLOAD_CONCURRENCY = 4
+SALESFORCE_DEFAULT_SAVE_CHUNK_SIZE = 100
+
+# Retries of throttled requests (429, 503 and concurrent REQUEST_LIMIT_EXCEEDED)
+SALESFORCE_MAX_RETRIES = 4
+SALESFORCE_RETRY_MAX_WAIT = 30
+SALESFORCE_DEFAULT_MAX_REQUESTS_PER_SECOND = 10
+SALESFORCE_DEFAULT_POLL_MIN_API_BUDGET = 10
+# Below this fraction of the daily API requests, polling is slowed down to SALESFORCE_LOW_BUDGET_REQUESTS_PER_SECOND
+SALESFORCE_API_BUDGET_SLOWDOWN = 0.25
+SALESFORCE_LOW_BUDGET_REQUESTS_PER_SECOND = 1
+# The API usage stored in the state is ignored when it was not refreshed recently
+SALESFORCE_API_USAGE_MAX_AGE = 900
+
+SALESFORCE_INGESTION_MODE_BATCH = "composite batch"
+SALESFORCE_INGESTION_MODE_SOQL = "soql query"
+SALESFORCE_INGESTION_MODES = [SALESFORCE_INGESTION_MODE_BATCH, SALESFORCE_INGESTION_MODE_SOQL]
+# Keep the query URL well below the 16,384 characters accepted by Salesforce
+SALESFORCE_MAX_QUERY_LENGTH = 12000
+SALESFORCE_SOQL_MAX_ALL_FIELDS_IDS = 200
+SALESFORCE_FIELD_NAME_REGEX = r"[A-Za-z][A-Za-z0-9_.]*"
+SALESFORCE_OBJECT_ID_REGEX = r"[A-Za-z0-9]{15}(?:[A-Za-z0-9]{3})?"
+
+SALESFORCE_CURSOR_MODE_OFFSET = "offset"
+SALESFORCE_CURSOR_MODE_WATERMARK = "last modified watermark"
+SALESFORCE_CURSOR_MODE_CHANGE_EVENTS = "change events"
+SALESFORCE_CURSOR_MODES = [SALESFORCE_CURSOR_MODE_OFFSET, SALESFORCE_CURSOR_MODE_WATERMARK, SALESFORCE_CURSOR_MODE_CHANGE_EVENTS]
+SALESFORCE_DEFAULT_STREAM_SECONDS = 60
+# Salesforce holds a CometD connect request for up to 110 seconds when no event is available
+SALESFORCE_COMETD_TIMEOUT = 130
+# Extra seconds given to a connect request over the time asked to Salesforce to hold it
+SALESFORCE_COMETD_TIMEOUT_MARGIN = 10
+# Number of times a poll opens a new Streaming API session when the server no longer knows its client ID
+SALESFORCE_COMETD_MAX_HANDSHAKES = 3
+SALESFORCE_REPLAY_ID_NEW_EVENTS = -1
+SALESFORCE_REPLAY_ID_ALL_EVENTS = -2
+SALESFORCE_CHANGE_EVENT_CHANNEL_PREFIX = "/data/"
+SALESFORCE_DELETE_CHANGE_TYPES = ["DELETE", "GAP_DELETE"]
+# Format of the datetime values returned by the REST API, for example 2023-03-02T10:15:30.000+0000
+SALESFORCE_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
+
+SALESFORCE_STREAM_CHUNK_SIZE = 1024 * 1024
+SALESFORCE_BULK_POLL_INITIAL_WAIT = 2
+SALESFORCE_BULK_POLL_MAX_WAIT = 30
+SALESFORCE_BULK_JOB_TIMEOUT = 3600
+SALESFORCE_BULK_RESULTS_PAGE_SIZE = 50000
+# sObject Collections accept up to 200 records per request, larger inputs are sent as a Bulk API 2.0 ingest job
+SALESFORCE_COLLECTIONS_CHUNK_SIZE = 200
+SALESFORCE_COLLECTIONS_MAX_RECORDS = 2000
+SALESFORCE_COMPOSITE_MAX_REQUESTS = 25
+SALESFORCE_COMPOSITE_GRAPH_MAX_REQUESTS = 500
+
+# Cached describe results are revalidated with If-Modified-Since once they are older than a day
+SALESFORCE_DESCRIBE_CACHE_TTL = 86400
+SALESFORCE_VERSION_CHECK_INTERVAL = 86400
+SALESFORCE_LISTVIEW_CACHE_TTL = 86400
+
+# Cached access tokens are reused for this many seconds, below the default 2 hour Salesforce session timeout.
+# A token revoked earlier is detected through the INVALID_SESSION_ID error and refreshed once.
+SALESFORCE_TOKEN_MAX_AGE = 3600
+SALESFORCE_INVALID_SESSION_ERR = "INVALID_SESSION_ID"
 
 # Number of random bytes used to generate the PKCE code_verifier (RFC 7636).
 SALESFORCE_PKCE_VERIFIER_BYTES = 96
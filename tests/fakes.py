@@ -0,0 +1,422 @@
+# File: fakes.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""Fakes of the SOAR platform and of the Salesforce endpoints, to run the connector offline."""
+
+import csv
+import io
+import json
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import phantom.app as phantom
+
+import salesforce_connector
+
+
+API_VERSION = "v59.0"
+
+
+def make_case_records(count):
+    """Get Case records with the fields of a Case of a default org, as returned by the sObject endpoint."""
+    return [
+        {
+            "attributes": {"type": "Case", "url": f"/services/data/{API_VERSION}/sobjects/Case/5003000000{number:05d}AAA"},
+            "Id": f"5003000000{number:05d}AAA",
+            "IsDeleted": False,
+            "MasterRecordId": None,
+            "CaseNumber": f"{number:08d}",
+            "ContactId": "0033000000ABCDEAAA",
+            "AccountId": "0013000000ABCDEAAA",
+            "AssetId": None,
+            "ParentId": None,
+            "SuppliedName": None,
+            "SuppliedEmail": f"user{number}@example.com",
+            "Type": "Problem",
+            "Status": "New",
+            "Reason": "Performance",
+            "Origin": "Web",
+            "Subject": f"Suspicious login {number}",
+            "Priority": ["High", "Medium", "Low"][number % 3],
+            "Description": "A user reported a suspicious login from an unknown location. " * 4,
+            "IsClosed": False,
+            "ClosedDate": None,
+            "IsEscalated": False,
+            "OwnerId": "0053000000ABCDEAAA",
+            "CreatedDate": "2026-01-01T00:00:00.000+0000",
+            "CreatedById": "0053000000ABCDEAAA",
+            "LastModifiedDate": "2026-01-02T00:00:00.000+0000",
+            "LastModifiedById": "0053000000ABCDEAAA",
+            "SystemModstamp": "2026-01-02T00:00:00.000+0000",
+            "LastViewedDate": "2026-01-03T00:00:00.000+0000",
+            "LastReferencedDate": "2026-01-03T00:00:00.000+0000",
+            "Incident_Severity__c": ["Severity 1 (High Impact)", "Severity 3 (Low Impact)", None][number % 3],
+            "Incident_Sensitivity__c": ["Sensitive", "Not Sensitive"][number % 2],
+        }
+        for number in range(count)
+    ]
+
+
+class FakePlatformConnector(salesforce_connector.SalesforceConnector):
+    """Connector run outside of the platform: the asset, its state directory and the saved containers are kept locally."""
+
+    def __init__(self, state_dir, config=None, asset_id="1", action_identifier="on_poll", save_latency=0.0):
+        super().__init__()
+        self.state_dir = str(state_dir)
+        self.config = dict(config or {})
+        self.asset_id = asset_id
+        self.action_identifier = action_identifier
+        self.save_latency = save_latency
+        self.containers = []
+        self.artifacts = []
+        self.platform_calls = 0
+        self.progress = []
+        self._platform_lock = threading.Lock()
+
+    def get_state_dir(self):
+        return self.state_dir
+
+    def get_asset_id(self):
+        return self.asset_id
+
+    def get_config(self):
+        return self.config
+
+    def get_action_identifier(self):
+        return self.action_identifier
+
+    def is_poll_now(self):
+        return False
+
+    def debug_print(self, *args, **kwargs):
+        pass
+
+    def save_progress(self, message, *args, **kwargs):
+        self.progress.append(message)
+
+    def send_progress(self, message, *args, **kwargs):
+        self.progress.append(message)
+
+    def load_state(self):
+        try:
+            with open(self._get_state_file_path()) as state_file:
+                return json.load(state_file)
+        except FileNotFoundError:
+            return {}
+
+    def _platform_call(self):
+        with self._platform_lock:
+            self.platform_calls += 1
+        time.sleep(self.save_latency)
+
+    def save_container(self, container):
+        self._platform_call()
+        container = {key: value for key, value in container.items() if key != "artifacts"}
+        with self._platform_lock:
+            self.containers.append(container)
+            container_id = len(self.containers)
+        return phantom.APP_SUCCESS, "Container saved", container_id
+
+    def save_artifacts(self, artifacts):
+        self._platform_call()
+        if any(artifact.get("container_id") is None for artifact in artifacts):
+            return phantom.APP_ERROR, "Artifacts must have a container_id", None
+        with self._platform_lock:
+            self.artifacts.extend(artifacts)
+        return phantom.APP_SUCCESS, "Artifacts saved", list(range(len(artifacts)))
+
+    def save_containers(self, containers):
+        self._platform_call()
+        responses = []
+        with self._platform_lock:
+            for container in containers:
+                self.containers.append({key: value for key, value in container.items() if key != "artifacts"})
+                container_id = len(self.containers)
+                self.artifacts.extend({**artifact, "container_id": container_id} for artifact in container.get("artifacts", []))
+                responses.append({"success": True, "id": container_id})
+        return phantom.APP_SUCCESS, "Containers saved", responses
+
+
+class FakeRequest:
+    def __init__(self, method, path, query, headers, body, connection_id):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.connection_id = connection_id
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class FakeSalesforce:
+    """Local HTTP server answering the Salesforce endpoints registered by a test.
+
+    A route handler gets the FakeRequest and returns the status code, the response body, a JSON document or
+    bytes, and optionally a dictionary of response headers. The server counts the TCP connections it accepts,
+    which is the number of handshakes a client with a connection pool pays.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.routes = []
+        self.requests = []
+        self.num_connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return "http://{}:{}".format(*self._server.server_address)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def route(self, method, path_regex, handler):
+        self.routes.append((method.upper(), re.compile(path_regex), handler))
+
+    def _dispatch(self, request):
+        with self._lock:
+            self.requests.append(request)
+        if self.latency:
+            time.sleep(self.latency)
+
+        for method, path_regex, handler in self.routes:
+            match = path_regex.fullmatch(request.path)
+            if method == request.method and match:
+                return handler(request, *match.groups())
+        return 404, [{"errorCode": "NOT_FOUND", "message": f"No route for {request.method} {request.path}"}]
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # The headers and the body are written separately, without TCP_NODELAY every keep-alive response waits for a delayed ACK
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with fake._lock:
+                    fake.num_connections += 1
+                    self.connection_id = fake.num_connections
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                path, _, query = self.path.partition("?")
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                request = FakeRequest(self.command, path, query, dict(self.headers), body, self.connection_id)
+                status, content, *headers = fake._dispatch(request)
+                headers = headers[0] if headers else {}
+
+                if isinstance(content, bytes):
+                    payload = content
+                    headers.setdefault("Content-Type", "application/octet-stream")
+                elif content is None:
+                    payload = b""
+                else:
+                    payload = json.dumps(content).encode("utf-8")
+                    headers.setdefault("Content-Type", "application/json;charset=UTF-8")
+
+                self.send_response(status)
+                for name, value in headers.items():
+                    for item in value if isinstance(value, list) else [value]:
+                        self.send_header(name, item)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+        return Handler
+
+
+def make_connector(state_dir, fake_salesforce=None, config=None, **kwargs):
+    """Get a connector signed in to the fake Salesforce server, the way initialize leaves it for an action."""
+    config = {"client_id": "client-id", "client_secret": "client-secret", "api_version": API_VERSION, **(config or {})}
+    connector = FakePlatformConnector(state_dir, config, **kwargs)
+    connector._state = connector._load_state()
+    connector._loaded_state = json.loads(json.dumps(connector._state))
+    connector._session = connector._create_session(config.get("connection_pool_size", 5))
+    connector._rate_limiter = salesforce_connector.TokenBucket(0, 1)
+    connector._oauth_token = "access-token"
+    connector._version_uri = f"/services/data/{API_VERSION}"
+    if fake_salesforce:
+        connector._base_url = fake_salesforce.url
+    return connector
+
+
+class FakeBayeux:
+    """Streaming API of a FakeSalesforce server, streaming the change events published by a test.
+
+    Like Salesforce, the server only knows a client ID in the requests carrying the BAYEUX_BROWSER cookie set by
+    its handshake, holds a connect request without events for the advice timeout and only retains the events
+    from retained_from on.
+    """
+
+    def __init__(self, fake_salesforce, max_hold=5.0):
+        self.max_hold = max_hold
+        self.events = []
+        self.retained_from = 1
+        self.clients = {}
+        self.num_handshakes = 0
+        self.subscribe_replay_ids = []
+        self.connect_timeouts = []
+        self.drop_clients_after_connects = None
+        self._num_connects = 0
+        self._condition = threading.Condition()
+        fake_salesforce.route("POST", r"/cometd/[\d.]+", self._handle)
+
+    def publish(self, channel, entity_name, change_type, record_ids):
+        with self._condition:
+            replay_id = len(self.events) + 1
+            header = {"entityName": entity_name, "changeType": change_type, "recordIds": record_ids}
+            self.events.append({"channel": channel, "data": {"payload": {"ChangeEventHeader": header}, "event": {"replayId": replay_id}}})
+            self._condition.notify_all()
+        return replay_id
+
+    def _pending_events(self, client):
+        return [
+            event
+            for event in self.events[self.retained_from - 1 :]
+            if event["channel"] in client["subscriptions"] and event["data"]["event"]["replayId"] > client["subscriptions"][event["channel"]]
+        ]
+
+    def _subscribe(self, client, message):
+        channel = message["subscription"]
+        replay_id = message["ext"]["replay"][channel]
+        self.subscribe_replay_ids.append(replay_id)
+
+        if replay_id == -1:
+            client["subscriptions"][channel] = len(self.events)
+        elif replay_id == -2:
+            client["subscriptions"][channel] = self.retained_from - 1
+        elif self.retained_from - 1 <= replay_id <= len(self.events):
+            client["subscriptions"][channel] = replay_id
+        else:
+            error = f"400::The replayId {{{replay_id}}} you provided was invalid. Please provide a valid ID, -2 to replay all events, or -1"
+            return {"channel": "/meta/subscribe", "successful": False, "error": error}
+
+        return {"channel": "/meta/subscribe", "successful": True, "subscription": channel}
+
+    def _connect(self, client, message):
+        hold = message.get("advice", {}).get("timeout", 110000) / 1000
+        self.connect_timeouts.append(hold)
+        deadline = time.time() + min(hold, self.max_hold)
+        while not self._pending_events(client) and time.time() < deadline:
+            self._condition.wait(deadline - time.time())
+
+        events = self._pending_events(client)
+        for event in events:
+            client["subscriptions"][event["channel"]] = event["data"]["event"]["replayId"]
+
+        self._num_connects += 1
+        if self._num_connects == self.drop_clients_after_connects:
+            self.clients.clear()
+        return [*events, {"channel": "/meta/connect", "successful": True, "clientId": message["clientId"]}]
+
+    def _handle(self, request):
+        cookies = dict(cookie.strip().split("=", 1) for cookie in request.headers.get("Cookie", "").split(";") if "=" in cookie)
+        replies = []
+        headers = {}
+
+        with self._condition:
+            for message in request.json():
+                channel = message["channel"]
+                if channel == "/meta/handshake":
+                    self.num_handshakes += 1
+                    client_id = f"client-{self.num_handshakes}"
+                    self.clients[client_id] = {"browser": f"browser-{self.num_handshakes}", "subscriptions": {}}
+                    headers["Set-Cookie"] = f"BAYEUX_BROWSER=browser-{self.num_handshakes}; Path=/"
+                    replies.append({"channel": channel, "successful": True, "clientId": client_id, "version": "1.0"})
+                    continue
+
+                client = self.clients.get(message.get("clientId"))
+                if client is None or client["browser"] != cookies.get("BAYEUX_BROWSER"):
+                    replies.append(
+                        {"channel": channel, "successful": False, "error": "403::Unknown client", "advice": {"reconnect": "handshake"}}
+                    )
+                elif channel == "/meta/subscribe":
+                    replies.append(self._subscribe(client, message))
+                elif channel == "/meta/connect":
+                    replies.extend(self._connect(client, message))
+                elif channel == "/meta/disconnect":
+                    self.clients.pop(message["clientId"], None)
+                    replies.append({"channel": channel, "successful": True})
+
+        return 200, replies, headers
+
+
+class FakeBulkQueryApi:
+    """Bulk API 2.0 query jobs of a FakeSalesforce server: job creation, job state and result pages by locator.
+
+    A job stays InProgress for the first pending_checks checks of its state, then ends in final_state. Its results
+    are the records given by the test, returned as CSV pages of at most maxRecords records.
+    """
+
+    def __init__(self, fake_salesforce, records, pending_checks=2, final_state="JobComplete"):
+        self.records = records
+        self.pending_checks = pending_checks
+        self.final_state = final_state
+        self.jobs = {}
+        self.locators = []
+        base = f"/services/data/{API_VERSION}/jobs/query"
+        fake_salesforce.route("POST", base, self._create_job)
+        fake_salesforce.route("GET", rf"{base}/(\w+)/?", self._get_job)
+        fake_salesforce.route("GET", rf"{base}/(\w+)/results", self._get_results)
+
+    def _create_job(self, request):
+        job_id = f"750{len(self.jobs) + 1:015d}"
+        self.jobs[job_id] = {"id": job_id, "operation": request.json()["operation"], "query": request.json()["query"], "checks": 0}
+        return 200, {"id": job_id, "state": "UploadComplete"}
+
+    def _get_job(self, request, job_id):
+        job = self.jobs[job_id]
+        job["checks"] += 1
+        state = "InProgress" if job["checks"] <= self.pending_checks else self.final_state
+        response = {"id": job_id, "state": state}
+        if state == "Failed":
+            response["errorMessage"] = "INVALID_FIELD: No such column 'Foo' on entity 'Case'"
+        return 200, response
+
+    def _get_results(self, request, job_id):
+        params = dict(parameter.split("=", 1) for parameter in request.query.split("&") if parameter)
+        self.locators.append(params.get("locator"))
+        offset = int(params.get("locator") or 0)
+        page = self.records[offset : offset + int(params["maxRecords"])]
+        next_offset = offset + len(page)
+
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=list(self.records[0]), lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(page)
+        headers = {
+            "Content-Type": "text/csv",
+            "Sforce-NumberOfRecords": str(len(page)),
+            "Sforce-Locator": str(next_offset) if next_offset < len(self.records) else "null",
+        }
+        return 200, output.getvalue().encode("utf-8"), headers
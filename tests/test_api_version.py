@@ -0,0 +1,57 @@
+# File: test_api_version.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import pytest
+
+
+pytest.importorskip("phantom")
+
+import phantom.app as phantom
+from fakes import FakeSalesforce, make_connector
+from phantom.action_result import ActionResult
+
+
+def server_error(request):
+    return 500, [{"errorCode": "UNKNOWN_EXCEPTION", "message": "The server is unavailable"}]
+
+
+@pytest.fixture
+def fake_salesforce():
+    with FakeSalesforce() as fake_salesforce:
+        fake_salesforce.route("GET", "/services/data/", server_error)
+        yield fake_salesforce
+
+
+@pytest.fixture
+def connector(tmp_path, fake_salesforce):
+    connector = make_connector(tmp_path, fake_salesforce, config={"api_version": ""})
+    connector._version_uri = None
+    return connector
+
+
+def test_discovery_error_is_reported(connector):
+    action_result = ActionResult()
+
+    assert phantom.is_fail(connector._resolve_api_version(action_result))
+    assert action_result.get_message().startswith("Unable to retrieve API version")
+    assert "The server is unavailable" in action_result.get_message()
+
+
+def test_cached_version_is_used_when_the_discovery_fails(connector):
+    connector._state.update({"latest_version": "/services/data/v58.0", "version_checked_at": 0})
+    action_result = ActionResult()
+
+    assert phantom.is_success(connector._resolve_api_version(action_result))
+    assert connector._version_uri == "/services/data/v58.0"
+    assert not action_result.get_message()
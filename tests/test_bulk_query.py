@@ -0,0 +1,102 @@
+# File: test_bulk_query.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import json
+import shutil
+
+import pytest
+
+
+pytest.importorskip("phantom")
+
+import phantom.app as phantom
+from fakes import FakeBulkQueryApi, FakeSalesforce, make_connector
+
+import salesforce_connector
+import salesforce_consts as sf_consts
+
+
+RECORDS = [{"Id": f"5003000000{number:05d}", "Subject": f"Subject, {number}", "Description": f'Line "{number}"'} for number in range(5)]
+
+
+@pytest.fixture
+def fake_salesforce():
+    with FakeSalesforce() as fake_salesforce:
+        yield fake_salesforce
+
+
+@pytest.fixture
+def vault(tmp_path, monkeypatch):
+    """Vault of the container, the files added to it are copied to the vault directory."""
+    vault_dir = tmp_path / "vault"
+    vault_dir.mkdir()
+
+    def vault_add(container, file_location, file_name):
+        shutil.copy(file_location, vault_dir / file_name)
+        return True, "Success", f"vault-id-{file_name}"
+
+    monkeypatch.setattr(salesforce_connector.ph_rules, "vault_add", vault_add)
+    monkeypatch.setattr(salesforce_connector.Vault, "get_vault_tmp_dir", staticmethod(lambda: str(tmp_path)))
+    monkeypatch.setattr(sf_consts, "SALESFORCE_BULK_POLL_INITIAL_WAIT", 0.01)
+    monkeypatch.setattr(sf_consts, "SALESFORCE_BULK_RESULTS_PAGE_SIZE", 2)
+    return vault_dir
+
+
+def run_bulk_query(tmp_path, fake_salesforce, **param):
+    connector = make_connector(tmp_path, fake_salesforce, action_identifier="run_bulk_query")
+    ret_val = connector._handle_run_bulk_query({"query": "SELECT Id, Subject, Description FROM Case", **param})
+    return ret_val, connector.get_action_results()[-1], connector
+
+
+def test_results_are_written_page_by_page_to_the_vault(tmp_path, fake_salesforce, vault):
+    bulk_api = FakeBulkQueryApi(fake_salesforce, RECORDS)
+
+    ret_val, action_result, connector = run_bulk_query(tmp_path, fake_salesforce)
+
+    assert phantom.is_success(ret_val), action_result.get_message()
+    job_id = action_result.get_summary()["job_id"]
+    assert action_result.get_summary()["num_objects"] == len(RECORDS)
+    assert bulk_api.jobs[job_id]["checks"] == 3
+    assert bulk_api.locators == [None, "2", "4"]
+    # The state of the job is checked again after a longer wait every time
+    assert [message for message in connector.progress if "Checking again" in message] == [
+        "Bulk job state: InProgress. Checking again in 0.01 seconds",
+        "Bulk job state: InProgress. Checking again in 0.02 seconds",
+    ]
+
+    with open(vault / f"salesforce_bulk_query_{job_id}.csv", newline="") as results_file:
+        content = results_file.read()
+    assert content.count("Id,Subject,Description") == 1
+    assert content.splitlines()[1] == '500300000000000,"Subject, 0","Line ""0"""'
+    assert len(content.splitlines()) == len(RECORDS) + 1
+
+
+def test_results_are_converted_to_ndjson(tmp_path, fake_salesforce, vault):
+    FakeBulkQueryApi(fake_salesforce, RECORDS, pending_checks=0)
+
+    ret_val, action_result, _connector = run_bulk_query(tmp_path, fake_salesforce, output_format="ndjson")
+
+    assert phantom.is_success(ret_val), action_result.get_message()
+    with open(vault / f"salesforce_bulk_query_{action_result.get_summary()['job_id']}.ndjson") as results_file:
+        assert [json.loads(line) for line in results_file] == RECORDS
+
+
+def test_failed_job_is_reported(tmp_path, fake_salesforce, vault):
+    FakeBulkQueryApi(fake_salesforce, RECORDS, final_state="Failed")
+
+    ret_val, action_result, _connector = run_bulk_query(tmp_path, fake_salesforce)
+
+    assert phantom.is_fail(ret_val)
+    assert action_result.get_message() == "Bulk job failed: INVALID_FIELD: No such column 'Foo' on entity 'Case'"
+    assert not list(vault.iterdir())
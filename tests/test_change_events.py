@@ -0,0 +1,141 @@
+# File: test_change_events.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+pytest.importorskip("phantom")
+
+import phantom.app as phantom
+from fakes import FakeBayeux, FakeSalesforce, make_connector
+from phantom.action_result import ActionResult
+
+
+CHANNEL = "/data/CaseChangeEvent"
+
+
+def record_id(number):
+    return f"5003000000{number:05d}"
+
+
+@pytest.fixture
+def fake_salesforce():
+    with FakeSalesforce() as fake_salesforce:
+        yield fake_salesforce
+
+
+@pytest.fixture
+def bayeux(fake_salesforce):
+    return FakeBayeux(fake_salesforce)
+
+
+@pytest.fixture
+def connector(tmp_path, fake_salesforce):
+    return make_connector(tmp_path, fake_salesforce)
+
+
+def poll(connector, replay_id, max_containers=0, duration=5, sobject="Case", channel=CHANNEL):
+    action_result = ActionResult()
+    ret_val, ids, new_replay_id = connector._poll_for_change_events(action_result, sobject, channel, replay_id, max_containers, duration)
+    assert phantom.is_success(ret_val), action_result.get_message()
+    return ids, new_replay_id
+
+
+def test_subscribe_from_replay_id(connector, bayeux):
+    for number in range(1, 6):
+        bayeux.publish(CHANNEL, "Case", "CREATE", [record_id(number)])
+
+    ids, replay_id = poll(connector, 2, max_containers=3)
+
+    assert ids == [record_id(3), record_id(4), record_id(5)]
+    assert replay_id == 5
+    assert bayeux.num_handshakes == 1
+    assert bayeux.subscribe_replay_ids == [2]
+
+
+def test_connect_returns_events_published_while_waiting(connector, bayeux):
+    threading.Timer(0.3, bayeux.publish, (CHANNEL, "Case", "UPDATE", [record_id(1)])).start()
+
+    start_time = time.monotonic()
+    ids, replay_id = poll(connector, -1, max_containers=1)
+
+    assert ids == [record_id(1)]
+    assert replay_id == 1
+    assert time.monotonic() - start_time < 3
+
+
+def test_connect_without_events_ends_with_the_poll(connector, bayeux):
+    start_time = time.monotonic()
+    ids, replay_id = poll(connector, -1, duration=1)
+
+    assert ids == []
+    assert replay_id == -1
+    assert time.monotonic() - start_time < 2
+    assert bayeux.connect_timeouts
+    assert all(timeout <= 1 for timeout in bayeux.connect_timeouts)
+
+
+def test_unknown_client_handshakes_again(connector, bayeux):
+    bayeux.publish(CHANNEL, "Case", "CREATE", [record_id(1)])
+    bayeux.drop_clients_after_connects = 1
+    threading.Timer(0.3, bayeux.publish, (CHANNEL, "Case", "CREATE", [record_id(2)])).start()
+
+    ids, replay_id = poll(connector, -2, max_containers=2)
+
+    assert ids == [record_id(1), record_id(2)]
+    assert replay_id == 2
+    assert bayeux.num_handshakes == 2
+    # The new session continues after the last event handled by the dropped one
+    assert bayeux.subscribe_replay_ids == [-2, 1]
+
+
+def test_other_objects_and_deletions_are_skipped(connector, bayeux):
+    bayeux.publish(CHANNEL, "Account", "CREATE", [record_id(1)])
+    bayeux.publish(CHANNEL, "Case", "DELETE", [record_id(2)])
+    bayeux.publish(CHANNEL, "Case", "UPDATE", ["000000000000000AAA", record_id(3)])
+    bayeux.publish(CHANNEL, "Case", "UPDATE", ["500300000*"])
+
+    ids, replay_id = poll(connector, -2, duration=1)
+
+    assert ids == ["000000000000000AAA", record_id(3)]
+    assert replay_id == 4
+
+
+def test_expired_replay_id_replays_the_retained_events(connector, bayeux):
+    for number in range(1, 6):
+        bayeux.publish(CHANNEL, "Case", "CREATE", [record_id(number)])
+    bayeux.retained_from = 4
+
+    ids, replay_id = poll(connector, 1, duration=1)
+
+    assert ids == [record_id(4), record_id(5)]
+    assert replay_id == 5
+    assert bayeux.subscribe_replay_ids == [1, -2]
+
+
+def test_parallel_streams_keep_their_own_client(connector, bayeux):
+    channels = ["/data/CaseChangeEvent", "/data/AccountChangeEvent"]
+    for number, channel in enumerate(channels * 2, 1):
+        bayeux.publish(channel, channel[6:-11], "CREATE", [record_id(number)])
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(lambda channel: poll(connector, -2, duration=1, sobject=channel[6:-11], channel=channel), channels))
+
+    assert results == [([record_id(1), record_id(3)], 3), ([record_id(2), record_id(4)], 4)]
+    # A stream sharing the cookies of the other one would be told its client is unknown and handshake again
+    assert bayeux.num_handshakes == 2
@@ -0,0 +1,84 @@
+# File: test_composite_batches.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import time
+
+import pytest
+
+
+pytest.importorskip("phantom")
+
+import phantom.app as phantom
+from fakes import API_VERSION, FakeSalesforce, make_case_records, make_connector
+from phantom.action_result import ActionResult
+
+import salesforce_consts as sf_consts
+
+
+NUM_RECORDS = 400
+# Round trip of a composite batch request to Salesforce
+LATENCY = 0.05
+RECORDS = {record["Id"]: record for record in make_case_records(NUM_RECORDS)}
+
+
+def composite_batch(failing_id=None):
+    def handler(request):
+        ids = [subrequest["url"].split("?")[0].rstrip("/").rsplit("/", 1)[-1] for subrequest in request.json()["batchRequests"]]
+        if failing_id in ids:
+            return 500, [{"errorCode": "UNKNOWN_EXCEPTION", "message": "An unexpected error occurred"}]
+        return 200, {"hasErrors": False, "results": [{"statusCode": 200, "result": RECORDS[x]} for x in ids]}
+
+    return handler
+
+
+@pytest.fixture
+def fake_salesforce():
+    with FakeSalesforce(latency=LATENCY) as fake_salesforce:
+        yield fake_salesforce
+
+
+def create_containers(tmp_path, fake_salesforce, concurrency):
+    connector = make_connector(tmp_path, fake_salesforce, config={"connection_pool_size": concurrency})
+    action_result = ActionResult()
+    start_time = time.perf_counter()
+    ret_val, containers = connector._create_containers_from_records(action_result, list(RECORDS), "Case", concurrency)
+    assert phantom.is_success(ret_val), action_result.get_message()
+    return containers, action_result, time.perf_counter() - start_time
+
+
+def test_composite_batches_benchmark(tmp_path, fake_salesforce):
+    fake_salesforce.route("POST", rf"/services/data/{API_VERSION}/composite/batch/", composite_batch())
+
+    sequential, _action_result, sequential_seconds = create_containers(tmp_path, fake_salesforce, 1)
+    concurrency = sf_consts.SALESFORCE_DEFAULT_BATCH_CONCURRENCY
+    parallel, _action_result, parallel_seconds = create_containers(tmp_path, fake_salesforce, concurrency)
+
+    print(f"\n{NUM_RECORDS} objects in {NUM_RECORDS // 25} composite batches with {LATENCY * 1000:.0f} ms of latency")
+    print(f"  sequential:        {sequential_seconds:.2f} s")
+    print(f"  {concurrency} parallel batches: {parallel_seconds:.2f} s")
+
+    # The containers are in the order of the IDs, whatever the order the batches complete in
+    assert [container["artifacts"][0]["cef"]["Id"] for container in parallel] == list(RECORDS)
+    assert parallel == sequential
+    assert parallel_seconds < sequential_seconds / 2
+
+
+def test_failed_batch_only_fails_its_objects(tmp_path, fake_salesforce):
+    ids = list(RECORDS)
+    fake_salesforce.route("POST", rf"/services/data/{API_VERSION}/composite/batch/", composite_batch(failing_id=ids[30]))
+
+    containers, action_result, _seconds = create_containers(tmp_path, fake_salesforce, 4)
+
+    assert action_result.get_summary() == {"failed_batches": 1}
+    assert [container["artifacts"][0]["cef"]["Id"] for container in containers] == ids[:25] + ids[50:]
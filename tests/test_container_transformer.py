@@ -0,0 +1,149 @@
+# File: test_container_transformer.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import hashlib
+import json
+import time
+import tracemalloc
+
+import pytest
+
+
+pytest.importorskip("phantom")
+
+from fakes import FakePlatformConnector, make_case_records
+
+
+NUM_RECORDS = 10000
+CEF_NAME_MAP = {"AccountId": "accountId", "Description": "description", "SuppliedEmail": "emailAddress"}
+
+
+def object_response_to_container_before(connector, response, sobject, cef_name_map):
+    """The record to container conversion before the transformer, with the cef_name_map passed in instead of read from the connector."""
+    container = {}
+    artifact = {}
+    cef = {}
+    cef_types = {}
+
+    container["artifacts"] = [artifact]
+    artifact["cef"] = cef
+    artifact["cef_types"] = cef_types
+
+    skip_field_names = {"attributes"}
+
+    severity_mapping = {
+        "severity 1 (high impact)": "high",
+        "severity 2 (medium impact": "medium",
+        "severity 3 (low impact)": "low",
+        "severity 4 (false positive)": "low",
+    }
+
+    sensitivity_mapping = {"sensitive": "red", "not sensitive": "white"}
+
+    container_name = None
+
+    for k, v in list(response.items()):
+        if k in skip_field_names:
+            continue
+        name = cef_name_map.get(k, k)
+        cef[name] = v
+        if k.endswith("Id") and v is not None:
+            cef_types[name] = ["salesforce object id"]
+
+        if name == "Subject":
+            container_name = v
+
+    if container_name is None:
+        number = response.get("CaseNumber") or response.get("Id", "")
+        container_name = f"Salesforce {sobject} Object # {number}"
+
+    container["name"] = container_name
+    artifact["name"] = sobject
+
+    try:
+        if not connector._last_viewed_date:
+            artifact["cef"].pop("LastViewedDate")
+            artifact["cef"].pop("LastReferencedDate")
+            connector.save_progress("Removed LastViewedDate and LastReferencedDate from the artifact.")
+    except:
+        connector.debug_print(
+            "LastViewedDate or LastReferencedDate may not be present in the artifact. Unable to remove LastViewedDate from the artifact"
+        )
+        pass
+
+    try:
+        artifact["source_data_identifier"] = hashlib.sha256(json.dumps(artifact)).hexdigest()
+        container["source_data_identifier"] = hashlib.sha256("{}{}".format(sobject, response["Id"])).hexdigest()
+    except:
+        artifact["source_data_identifier"] = hashlib.sha256(json.dumps(artifact).encode()).hexdigest()
+        container["source_data_identifier"] = hashlib.sha256("{}{}".format(sobject, response["Id"]).encode()).hexdigest()
+
+    severity = response.get("Incident_Severity__c")
+    if severity:
+        container["severity"] = severity_mapping.get(severity.lower(), "medium")
+
+    sensitivity = response.get("Incident_Sensitivity__c")
+    if sensitivity:
+        container["sensitivity"] = sensitivity_mapping.get(sensitivity.lower(), "amber")
+
+    return container
+
+
+def measure(convert, records):
+    """Convert the records, return the containers, the seconds taken and the peak of the memory allocated by a conversion."""
+    start_time = time.perf_counter()
+    containers = [convert(record) for record in records]
+    seconds = time.perf_counter() - start_time
+
+    # The containers are not kept, so the peak is the memory a single conversion allocates
+    tracemalloc.start()
+    for record in records:
+        convert(record)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return containers, seconds, peak
+
+
+@pytest.mark.parametrize("last_viewed_date", [False, True])
+def test_containers_are_unchanged(tmp_path, last_viewed_date):
+    connector = FakePlatformConnector(tmp_path)
+    connector._last_viewed_date = last_viewed_date
+    records = make_case_records(30)
+
+    before = [object_response_to_container_before(connector, record, "Case", CEF_NAME_MAP) for record in records]
+    after = [connector._object_response_to_container(record, "Case", CEF_NAME_MAP) for record in records]
+
+    # Equal source data identifiers mean the artifacts ingested before the change are not ingested again
+    assert after == before
+    assert ("LastViewedDate" in after[0]["artifacts"][0]["cef"]) == last_viewed_date
+    assert after[0]["severity"] == "high"
+    assert after[0]["sensitivity"] == "red"
+
+
+def test_container_transformer_benchmark(tmp_path):
+    connector = FakePlatformConnector(tmp_path)
+    records = make_case_records(NUM_RECORDS)
+
+    before, before_seconds, before_peak = measure(
+        lambda record: object_response_to_container_before(connector, record, "Case", CEF_NAME_MAP), records
+    )
+    after, after_seconds, after_peak = measure(lambda record: connector._object_response_to_container(record, "Case", CEF_NAME_MAP), records)
+
+    print(f"\nConverting {NUM_RECORDS} Case records to containers")
+    print(f"  per record setup: {NUM_RECORDS / before_seconds:,.0f} records/s, {before_peak / 1024:.1f} KiB peak allocation")
+    print(f"  transformer:      {NUM_RECORDS / after_seconds:,.0f} records/s, {after_peak / 1024:.1f} KiB peak allocation")
+
+    assert after == before
+    assert after_seconds < before_seconds
+    assert after_peak < before_peak
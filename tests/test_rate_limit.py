@@ -0,0 +1,74 @@
+# File: test_rate_limit.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import multiprocessing
+import time
+
+import pytest
+
+
+pytest.importorskip("phantom")
+
+import salesforce_connector
+
+
+RATE = 50
+NUM_ACTIONS = 4
+NUM_REQUESTS = 10
+
+
+def _run_action(path):
+    # Every action run creates its own bucket in initialize
+    bucket = salesforce_connector.SharedTokenBucket(path, RATE, 1)
+    for _ in range(NUM_REQUESTS):
+        bucket.acquire()
+
+
+def test_action_runs_share_the_rate_limit(tmp_path):
+    context = multiprocessing.get_context("fork")
+    actions = [context.Process(target=_run_action, args=(str(tmp_path / "1_rate_limit.json"),)) for _ in range(NUM_ACTIONS)]
+
+    start_time = time.monotonic()
+    for process in actions:
+        process.start()
+    for process in actions:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+    elapsed = time.monotonic() - start_time
+
+    # Separate buckets would let every action run send its requests in NUM_REQUESTS / RATE seconds
+    assert elapsed >= (NUM_ACTIONS * NUM_REQUESTS - 1) / RATE * 0.9
+
+
+def test_set_rate_only_slows_down_the_current_action_run(tmp_path):
+    path = str(tmp_path / "1_rate_limit.json")
+    slowed_down = salesforce_connector.SharedTokenBucket(path, RATE, 1)
+    slowed_down.set_rate(RATE / 5)
+    other = salesforce_connector.SharedTokenBucket(path, RATE, 1)
+
+    start_time = time.monotonic()
+    for _ in range(3):
+        slowed_down.acquire()
+    assert time.monotonic() - start_time >= 2 * 5 / RATE * 0.9
+
+    start_time = time.monotonic()
+    for _ in range(3):
+        other.acquire()
+    assert time.monotonic() - start_time < 2 * 5 / RATE
+
+
+def test_no_limit(tmp_path):
+    bucket = salesforce_connector.SharedTokenBucket(str(tmp_path / "1_rate_limit.json"), 0, 1)
+    assert sum(bucket.acquire() for _ in range(100)) == 0
+    assert not (tmp_path / "1_rate_limit.json").exists()
@@ -0,0 +1,141 @@
+# File: test_responses.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import json
+import time
+
+import pytest
+
+
+pytest.importorskip("phantom")
+
+import phantom.app as phantom
+import requests
+from fakes import FakePlatformConnector, make_case_records
+from phantom.action_result import ActionResult
+
+import salesforce_connector
+import salesforce_consts as sf_consts
+
+
+NUM_PAGES = 20
+# Records of a list view results page, the largest page size
+NUM_RECORDS = 2000
+
+
+class DebugActionResult(ActionResult):
+    """Action result keeping the debug data added to it."""
+
+    def __init__(self, param=None):
+        super().__init__(param)
+        self.debug_data = []
+
+    def add_debug_data(self, debug_data):
+        self.debug_data.append(debug_data)
+
+
+def make_response(content, status_code=200):
+    response = requests.Response()
+    response._content = content
+    response.status_code = status_code
+    response.headers["Content-Type"] = "application/json;charset=UTF-8"
+    response.encoding = "UTF-8"
+    return response
+
+
+def make_list_view_page():
+    """Get the body of a list view results page, the way Salesforce returns it."""
+    records = make_case_records(NUM_RECORDS)
+    columns = [name for name in records[0] if name != "attributes"]
+    page = {
+        "columns": [{"fieldNameOrPath": name, "hidden": False, "label": name, "sortable": True, "type": "string"} for name in columns],
+        "developerName": "AllOpenCases",
+        "done": True,
+        "id": "00B300000000000AAA",
+        "label": "All Open Cases",
+        "records": [{"columns": [{"fieldNameOrPath": name, "value": record[name]} for name in columns]} for record in records],
+        "size": NUM_RECORDS,
+    }
+    return json.dumps(page).encode()
+
+
+def process_response_before(r, action_result):
+    """Response processing before the change: the full body is copied to the debug data, then decoded again to parse it."""
+    action_result.add_debug_data({"r_status_code": r.status_code})
+    action_result.add_debug_data({"r_text": r.text})
+    action_result.add_debug_data({"r_headers": r.headers})
+    return phantom.APP_SUCCESS, r.json()
+
+
+def time_pages(process_response, content):
+    """Process NUM_PAGES responses, return the last response, the characters of body kept in the debug data and the seconds taken."""
+    debug_length = 0
+    start_time = time.perf_counter()
+    for _ in range(NUM_PAGES):
+        # A new response for every page, requests caches the decoded text
+        action_result = DebugActionResult()
+        ret_val, response = process_response(make_response(content), action_result)
+        assert phantom.is_success(ret_val)
+        debug_length += sum(len(debug_data.get("r_text", "")) for debug_data in action_result.debug_data)
+    return response, debug_length, time.perf_counter() - start_time
+
+
+@pytest.mark.parametrize("backend", ["json", "orjson"])
+def test_process_response_benchmark(tmp_path, monkeypatch, backend):
+    if backend == "orjson":
+        monkeypatch.setattr(salesforce_connector, "orjson", pytest.importorskip("orjson"))
+    else:
+        monkeypatch.setattr(salesforce_connector, "orjson", None)
+    connector = FakePlatformConnector(tmp_path)
+    content = make_list_view_page()
+
+    before_response, before_debug_length, before_seconds = time_pages(process_response_before, content)
+    after_response, after_debug_length, after_seconds = time_pages(connector._process_response, content)
+
+    print(f"\n{NUM_PAGES} list view pages of {NUM_RECORDS} records, {len(content) / 1e6:.1f} MB each")
+    print(f"  debug copy and r.json(): {before_seconds:.2f} s, {before_debug_length / 1e6:.1f} MB of debug data")
+    print(f"  single decode, {backend}:   {after_seconds:.2f} s, {after_debug_length / 1e6:.1f} MB of debug data")
+
+    assert after_response == before_response
+    assert before_debug_length == NUM_PAGES * len(content)
+    assert after_debug_length == 0
+    # The stdlib parser decodes the body to text as r.json() does, only orjson parses the bytes faster
+    if backend == "orjson":
+        assert after_seconds < before_seconds
+
+
+def test_successful_response_adds_no_debug_data(tmp_path):
+    connector = FakePlatformConnector(tmp_path)
+    action_result = DebugActionResult()
+
+    ret_val, response = connector._process_response(make_response(b'{"size": 0, "records": []}'), action_result)
+
+    assert phantom.is_success(ret_val)
+    assert response == {"size": 0, "records": []}
+    assert action_result.debug_data == []
+
+
+def test_failed_response_adds_truncated_debug_data(tmp_path):
+    connector = FakePlatformConnector(tmp_path)
+    action_result = DebugActionResult()
+    content = json.dumps([{"errorCode": "MALFORMED_QUERY", "message": "x" * 10000}]).encode()
+
+    ret_val, _response = connector._process_response(make_response(content, status_code=400), action_result)
+
+    assert phantom.is_fail(ret_val)
+    assert "MALFORMED_QUERY" in action_result.get_message()
+    status_code, text, headers = action_result.debug_data
+    assert status_code == {"r_status_code": 400}
+    assert text == {"r_text": content.decode()[: sf_consts.SALESFORCE_DEBUG_TEXT_MAX_LENGTH]}
+    assert headers["r_headers"]["Content-Type"] == "application/json;charset=UTF-8"
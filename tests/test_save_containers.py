@@ -0,0 +1,90 @@
+# File: test_save_containers.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import time
+
+import pytest
+
+
+pytest.importorskip("phantom")
+
+import phantom.app as phantom
+from fakes import FakePlatformConnector
+
+import salesforce_consts as sf_consts
+
+
+NUM_CONTAINERS = 2000
+# Round trip of a platform call from the connector process to the platform
+SAVE_LATENCY = 0.001
+
+
+def make_containers(count):
+    return [
+        {
+            "name": f"Case {number}",
+            "source_data_identifier": f"5003000000{number:05d}",
+            "artifacts": [{"name": "Case Artifact", "cef": {"Id": f"5003000000{number:05d}", "Subject": f"Subject {number}"}}],
+        }
+        for number in range(count)
+    ]
+
+
+def test_failed_container_is_not_saved_with_its_artifacts(tmp_path):
+    connector = FakePlatformConnector(tmp_path)
+    connector.save_container = lambda container: (phantom.APP_ERROR, "Error", None)
+    container = make_containers(1)[0]
+
+    assert connector._save_container_artifacts(container, container.pop("artifacts")) is None
+    assert connector.platform_calls == 0
+    assert connector.artifacts == []
+
+
+def test_failed_container_of_a_chunk_is_reported(tmp_path):
+    connector = FakePlatformConnector(tmp_path)
+    connector.save_containers = lambda containers: (
+        phantom.APP_SUCCESS,
+        "",
+        [{"success": True, "id": 1}, {"success": False, "message": "Invalid container"}, {"success": True, "id": 3}],
+    )
+
+    summary = connector._save_containers(make_containers(3), sf_consts.SALESFORCE_DEFAULT_SAVE_CHUNK_SIZE)
+
+    assert summary["num_saved"] == 2
+    assert summary["num_failed"] == 1
+    assert connector.progress == ["Error saving container Case 1: Invalid container"]
+
+
+def test_save_benchmark(tmp_path):
+    """Compare the former save loop, one save_container and save_artifacts call per container, with the chunked saves."""
+    before = FakePlatformConnector(tmp_path, save_latency=SAVE_LATENCY)
+    start_time = time.perf_counter()
+    for container in make_containers(NUM_CONTAINERS):
+        before._save_container_artifacts(container, container.pop("artifacts"))
+    before_seconds = time.perf_counter() - start_time
+
+    after = FakePlatformConnector(tmp_path, save_latency=SAVE_LATENCY)
+    start_time = time.perf_counter()
+    summary = after._save_containers(make_containers(NUM_CONTAINERS), sf_consts.SALESFORCE_DEFAULT_SAVE_CHUNK_SIZE)
+    after_seconds = time.perf_counter() - start_time
+
+    print(f"\nSaving {NUM_CONTAINERS} containers with {SAVE_LATENCY * 1000:.0f} ms per platform call")
+    print(f"  per container: {before.platform_calls} calls, {before_seconds:.2f} s")
+    print(f"  chunked:       {after.platform_calls} calls, {after_seconds:.2f} s")
+
+    assert before.platform_calls == 2 * NUM_CONTAINERS
+    assert after.platform_calls == NUM_CONTAINERS // sf_consts.SALESFORCE_DEFAULT_SAVE_CHUNK_SIZE
+    assert summary["num_saved"] == NUM_CONTAINERS
+    assert len(after.artifacts) == len(before.artifacts) == NUM_CONTAINERS
+    assert after_seconds < before_seconds
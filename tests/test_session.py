@@ -0,0 +1,64 @@
+# File: test_session.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import time
+
+import pytest
+
+
+pytest.importorskip("phantom")
+
+import phantom.app as phantom
+import requests
+from fakes import API_VERSION, FakeSalesforce, make_case_records, make_connector
+from phantom.action_result import ActionResult
+
+
+NUM_REQUESTS = 200
+
+
+@pytest.fixture
+def fake_salesforce():
+    record = make_case_records(1)[0]
+    with FakeSalesforce() as fake_salesforce:
+        fake_salesforce.route("GET", rf"/services/data/{API_VERSION}/sobjects/Case/(\w+)", lambda request, case_id: (200, record))
+        yield fake_salesforce
+
+
+def get_cases(connector, fake_salesforce):
+    """Get NUM_REQUESTS objects, return the number of connections opened to the server and the seconds taken."""
+    num_connections = fake_salesforce.num_connections
+    start_time = time.perf_counter()
+    for _ in range(NUM_REQUESTS):
+        action_result = ActionResult()
+        ret_val, _response = connector._make_rest_call_helper(f"/services/data/{API_VERSION}/sobjects/Case/500300000000000", action_result)
+        assert phantom.is_success(ret_val), action_result.get_message()
+    return fake_salesforce.num_connections - num_connections, time.perf_counter() - start_time
+
+
+def test_session_benchmark(tmp_path, fake_salesforce):
+    """Compare the module-level requests functions the connector used to call with the pooled session."""
+    before = make_connector(tmp_path, fake_salesforce)
+    before._session = requests
+    before_connections, before_seconds = get_cases(before, fake_salesforce)
+
+    after = make_connector(tmp_path, fake_salesforce)
+    after_connections, after_seconds = get_cases(after, fake_salesforce)
+
+    print(f"\n{NUM_REQUESTS} REST calls to a local stub server")
+    print(f"  requests functions: {before_connections} connections, {before_seconds:.2f} s")
+    print(f"  pooled session:     {after_connections} connections, {after_seconds:.2f} s")
+
+    assert before_connections == NUM_REQUESTS
+    assert after_connections == 1
@@ -0,0 +1,115 @@
+# File: test_state.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import json
+import multiprocessing
+import os
+
+import pytest
+
+
+pytest.importorskip("phantom")
+
+from fakes import FakePlatformConnector
+
+import salesforce_connector
+
+
+NUM_WORKERS = 8
+NUM_UPDATES = 25
+
+
+def _run_action(state_dir, update):
+    """Load the state the way initialize does, change it and save it the way finalize does."""
+    connector = FakePlatformConnector(state_dir)
+    connector._state = connector._load_state()
+    connector._loaded_state = json.loads(json.dumps(connector._state))
+    update(connector._state)
+    connector._save_state()
+
+
+def _worker(state_dir, worker):
+    for _ in range(NUM_UPDATES):
+        _run_action(state_dir, lambda state: state.update({f"worker_{worker}": state.get(f"worker_{worker}", 0) + 1}))
+
+
+def test_concurrent_actions_do_not_lose_updates(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_worker, args=(str(tmp_path), worker)) for worker in range(NUM_WORKERS)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=120)
+        assert process.exitcode == 0
+
+    with open(tmp_path / "1_state.json") as state_file:
+        state = json.load(state_file)
+    assert state == {f"worker_{worker}": NUM_UPDATES for worker in range(NUM_WORKERS)}
+
+
+def test_key_saved_by_another_action_is_kept(tmp_path):
+    first = FakePlatformConnector(tmp_path)
+    first._state = {"refresh_token": "old", "cur_offset": 0}
+    first._save_state()
+
+    second = FakePlatformConnector(tmp_path)
+    second._state = second._load_state()
+    second._loaded_state = dict(second._state)
+
+    first._state["refresh_token"] = "rotated"
+    first._save_state(["refresh_token"])
+
+    second._state.update({"refresh_token": "stale", "cur_offset": 100})
+    second._save_state()
+
+    assert second._state == {"refresh_token": "rotated", "cur_offset": 100}
+
+
+def test_mid_action_save_only_writes_its_keys(tmp_path):
+    connector = FakePlatformConnector(tmp_path)
+    connector._state = {"refresh_token": "old", "cur_offset": 0}
+    connector._save_state()
+    state = connector._state
+
+    state.update({"refresh_token": "rotated", "cur_offset": 100})
+    connector._save_state(["refresh_token"])
+
+    assert connector._state is state
+    assert connector.load_state() == {"refresh_token": "rotated", "cur_offset": 0}
+
+    connector._save_state()
+    assert connector.load_state() == {"refresh_token": "rotated", "cur_offset": 100}
+
+
+def test_state_file_keeps_its_mode(tmp_path):
+    state_file = tmp_path / "1_state.json"
+    state_file.write_text("{}")
+    os.chmod(state_file, 0o640)
+
+    connector = FakePlatformConnector(tmp_path)
+    connector._state = {"cur_offset": 1}
+    connector._save_state()
+
+    assert os.stat(state_file).st_mode & 0o777 == 0o640
+    assert json.loads(state_file.read_text()) == {"cur_offset": 1}
+
+
+def test_new_state_file_gets_the_umask_mode(tmp_path):
+    umask = os.umask(0o027)
+    try:
+        salesforce_connector._write_json_atomically(str(tmp_path / "state.json"), {})
+    finally:
+        os.umask(umask)
+
+    assert os.stat(tmp_path / "state.json").st_mode & 0o777 == 0o640